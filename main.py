@@ -1,14 +1,13 @@
 import sys
 from io import StringIO
 
-import matplotlib
-matplotlib.use("QT4Agg")
-from PySide.QtGui import QApplication
 
-from ui.widgets import MainWindow
+def gui():
+    import matplotlib
+    matplotlib.use("QT4Agg")
+    from PySide.QtGui import QApplication
 
-
-def main():
+    from ui.widgets import MainWindow
 
     # Ugly hack, because it goes insane without running terminal(wtf)
     sys.stdout = StringIO()
@@ -24,5 +23,13 @@ def main():
 
     app.exec_()
 
+
+def main():
+    if sys.argv[1:2] == ['batch']:
+        # headless, keep Qt out of it
+        from spectral.batch import main as batch
+        return batch(sys.argv[2:])
+    gui()
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,3 @@
+""" Spectral processing that doesn't need Qt to run. """
+
+from spectral.document import SpectralDocument
@@ -0,0 +1,251 @@
+""" Headless batch filtering, `Fourierism batch --help`
+
+    Never imports PySide, images are read and written with Pillow.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from spectral import color, fft, imagefile, outofcore
+from spectral.blockwise import BlockFilter, TILE
+from spectral.document import SpectralDocument
+from spectral.kernels import PROFILES
+from spectral.recipe import (FILTERS, Recipe, filter_op, resize_op,
+                             stripes_op)
+from spectral.resample import WINDOWS
+
+EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff',
+              '.npy')
+
+
+def parse_filter(spec):
+    """ 'low:30:gaussian' -> filter op, see spectral.recipe
+
+        Radii are % of the larger side, profile defaults to 'hard'.
+        '@n' at the end limits a filter to channel n of color images.
+    """
+    text = spec
+    channel = None
+    if '@' in spec:
+        spec, channel = spec.rsplit('@', 1)
+        if not channel.isdigit():
+            raise argparse.ArgumentTypeError(
+                "bad filter spec {!r}".format(text))
+        channel = int(channel)
+    name, *params = spec.split(':')
+    profile = 'hard'
+    if params and params[-1] in PROFILES:
+        profile = params.pop()
+    if name not in FILTERS or len(params) != FILTERS[name][0]:
+        raise argparse.ArgumentTypeError("bad filter spec {!r}".format(text))
+    try:
+        return filter_op(name, map(float, params), profile, channel)
+    except ValueError:
+        raise argparse.ArgumentTypeError("bad filter spec {!r}".format(text))
+
+
+def parse_stripes(spec):
+    """ 'thickness:spacing:angle:opacity' -> stripes op, opacity in % """
+    try:
+        thickness, spacing, angle, opacity = map(float, spec.split(':'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            "bad stripes spec {!r}".format(spec))
+    return stripes_op(thickness, spacing, angle, opacity / 100)
+
+
+def filter_array(array, recipe):
+    """ Replay `recipe` on the image, same as doing it in the Fourier window
+
+        `array` may be a (C, H, W) stack, all channels go through one
+        batched transform.
+    """
+    document = SpectralDocument(history_bytes=0)
+    document.load(array)
+    recipe.apply(document)
+    return document.render()
+
+
+def _init_worker(precision):
+    # one process per core already, don't let FFTs fight for them
+    fft.THREADS = 1
+    fft.set_precision(precision)
+
+
+def process_file(src, dst, recipe, mode='gray'):
+    """ Filter `src` into `dst`, 16 bit and float stay what they were
+
+        Returns (src, shape of what got written, seconds).
+    """
+    start = time.perf_counter()
+    array, depth = imagefile.read(src, mode)
+    result = filter_array(array, recipe)
+    imagefile.write(dst, result, depth, mode)
+    return src, result.shape[-2:], time.perf_counter() - start
+
+
+def process_file_out_of_core(src, dst, recipe, budget, tile=None):
+    """ process_file for images bigger than RAM, filter ops only
+
+        With `tile` set the filters go block-wise (spectral.blockwise),
+        otherwise through a spectrum on disk (spectral.outofcore).
+        .npy output is written as a memmap, anything else goes through
+        Pillow, which wants the whole result in memory at the output depth.
+    """
+    start = time.perf_counter()
+    source = outofcore.open_source(src, budget)
+    if tile:
+        blocks = BlockFilter(recipe, source.shape, tile)
+        render = lambda out=None: blocks.apply(source, out)
+    else:
+        spectrum = outofcore.OutOfCoreSpectrum(source, budget)
+        render = lambda out=None: spectrum.render(recipe, out)
+
+    if dst.lower().endswith('.npy'):
+        result = render(np.lib.format.open_memmap(dst, 'w+', np.float32,
+                                                  source.shape))
+    else:
+        result = render()
+        imagefile.write(dst, result, imagefile.depth(src))
+    return src, result.shape, time.perf_counter() - start
+
+
+def _guarded(process, src, *args):
+    """ process(src, *args), with an error as (src, None, seconds, error)
+        so one bad file doesn't take the whole batch down
+    """
+    start = time.perf_counter()
+    try:
+        return process(src, *args) + (None,)
+    except Exception as error:
+        return src, None, time.perf_counter() - start, error
+
+
+def find_images(directory):
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(EXTENSIONS):
+            yield os.path.join(directory, name)
+
+
+def _results(sources, output, recipe, jobs, mode, budget, tile):
+    destination = lambda src: os.path.join(output, os.path.basename(src))
+    if budget or tile:
+        # one big image at a time, its transforms get all the cores
+        for src in sources:
+            yield _guarded(process_file_out_of_core, src, destination(src),
+                           recipe, budget, tile)
+        return
+
+    with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                             initargs=(fft.get_precision(),)) as pool:
+        futures = {pool.submit(_guarded, process_file, src, destination(src),
+                               recipe, mode): src
+                   for src in sources}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as error:  # the worker process itself died
+                yield futures[future], None, 0.0, error
+
+
+def run(sources, output, recipe, jobs=None, mode='gray', budget=None,
+        tile=None, out=sys.stdout):
+    """ Process `sources` into `output`, a line per file on `out`,
+        returns how many failed
+    """
+    os.makedirs(output, exist_ok=True)
+    start = time.perf_counter()
+    count = pixels = failed = 0
+
+    for src, shape, elapsed, error in _results(sources, output, recipe, jobs,
+                                               mode, budget, tile):
+        if error is not None:
+            failed += 1
+            print("{}\tfailed: {}\t{:.3f}s".format(src, error, elapsed),
+                  file=out)
+        else:
+            h, w = shape
+            count += 1
+            pixels += h * w
+            print("{}\t{}x{}\t{:.3f}s".format(src, w, h, elapsed),
+                  file=out)
+        out.flush()
+
+    total = time.perf_counter() - start
+    print("{} files in {:.2f}s, {:.2f} files/s, {:.2f} MP/s".format(
+          count, total, count / total, pixels / total / 1e6), file=out)
+    if failed:
+        print("{} files failed".format(failed), file=out)
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='Fourierism batch',
+        description="Apply spectral filters to every image in a directory")
+    parser.add_argument('input', help="directory with images")
+    parser.add_argument('output', help="directory for results")
+    parser.add_argument('--recipe', type=Recipe.load,
+                        help="recipe saved from the Fourier window, "
+                             "replayed before --filter and --resize")
+    parser.add_argument('-f', '--filter', dest='filters', action='append',
+                        type=parse_filter, default=[],
+                        help="low:R, high:R, band:R1:R2 or bandstop:R1:R2, "
+                             "radii in %% of the larger side, optionally "
+                             "followed by :gaussian or :butterworth, "
+                             "@N to filter channel N only, repeatable")
+    parser.add_argument('-s', '--stripes', action='append',
+                        type=parse_stripes, default=[],
+                        help="blend in black stripes, "
+                             "thickness:spacing:angle:opacity, pixels, "
+                             "degrees and %%, done on the spectrum, "
+                             "repeatable")
+    parser.add_argument('-r', '--resize', type=float, default=1.0,
+                        help="spectral resize factor, under 1 shrinks")
+    parser.add_argument('-w', '--window', choices=sorted(WINDOWS),
+                        help="apodization window for --resize")
+    parser.add_argument('--smooth', action='store_true',
+                        help="let --resize go on to the nearest size "
+                             "with no prime factors but 2, 3 and 5")
+    parser.add_argument('-c', '--color', choices=color.MODES,
+                        default='gray',
+                        help="process channels of this color model, "
+                             "default gray")
+    parser.add_argument('-p', '--precision', choices=sorted(fft.PRECISIONS),
+                        default=fft.get_precision(),
+                        help="single halves memory, default %(default)s")
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help="worker processes, default one per core")
+    parser.add_argument('-b', '--budget', type=int, default=None,
+                        metavar='MB',
+                        help="out of core: keep at most this many MB of "
+                             "the spectrum in RAM, the rest in scratch "
+                             "files, one image at a time, filters only")
+    parser.add_argument('-t', '--tile', type=int, nargs='?', default=None,
+                        const=TILE,
+                        help="filter block-wise with overlap-save on tiles "
+                             "of this size (default %(const)s), close to "
+                             "but not exactly the full-frame result")
+    args = parser.parse_args(argv)
+    fft.set_precision(args.precision)
+    if ((args.budget or args.tile)
+            and (args.color != 'gray' or args.resize != 1.0
+                 or args.stripes)):
+        parser.error("--budget and --tile work on gray images "
+                     "with filters only")
+
+    recipe = args.recipe or Recipe()
+    recipe.extend(args.filters)
+    recipe.extend(args.stripes)
+    if args.resize != 1.0 or args.window:
+        recipe.append(resize_op(args.resize, args.window, args.smooth))
+
+    failed = run(list(find_images(args.input)), args.output, recipe,
+                 args.jobs, args.color, args.budget and args.budget * 2**20,
+                 args.tile)
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,47 @@
+""" Brush strokes rasterized straight into boolean masks """
+import numpy as np
+
+
+def kernel(shape, size):
+    """ Boolean footprint of a single brush stamp """
+    if shape == 'circle':
+        c = (size - 1) / 2
+        y, x = np.ogrid[:size, :size]
+        return (y - c)**2 + (x - c)**2 <= (size / 2)**2
+    return np.ones((size, size), dtype=bool)
+
+
+def mirror(points, shape, size, x_sym=False, y_sym=False, opp_sym=False):
+    """ Add symmetric counterparts of stamp positions (top left corners) """
+    max_y, max_x = shape
+    points = np.asarray(points, dtype=np.intp).reshape(-1, 2)
+    x, y = points[:, 0], points[:, 1]
+    mx, my = abs(max_x - x - size), abs(max_y - y - size)
+
+    mirrored = [points]
+    if x_sym:
+        mirrored.append(np.column_stack((mx, y)))
+    if y_sym:
+        mirrored.append(np.column_stack((x, my)))
+    if (x_sym and y_sym) or opp_sym:
+        mirrored.append(np.column_stack((mx, my)))
+    return np.concatenate(mirrored)
+
+
+def rasterize(points, shape, brush='square', size=20, **symmetry):
+    """ Mask of everything a stroke through `points` [(x, y), ...] covers
+
+        `symmetry` takes x_sym, y_sym and opp_sym, same as Fourier.
+    """
+    mask = np.zeros(shape, dtype=bool)
+    if not len(points):
+        return mask
+
+    points = np.unique(mirror(points, shape, size, **symmetry), axis=0)
+    dy, dx = np.nonzero(kernel(brush, size))
+    xs = (points[:, 0, None] + dx).ravel()
+    ys = (points[:, 1, None] + dy).ravel()
+
+    inside = (ys >= 0) & (ys < shape[0]) & (xs >= 0) & (xs < shape[1])
+    mask[ys[inside], xs[inside]] = True
+    return mask
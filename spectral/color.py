@@ -0,0 +1,30 @@
+""" Color images as (C, H, W) channel stacks, what SpectralDocument takes
+
+    YCbCr is the full range JPEG one, filtering only Y (channel 0) keeps
+    the colors and is a third of the work.
+"""
+import numpy as np
+
+MODES = ('gray', 'rgb', 'ycbcr')
+
+RGB_TO_YCBCR = np.array([[0.299, 0.587, 0.114],
+                         [-0.168736, -0.331264, 0.5],
+                         [0.5, -0.418688, -0.081312]])
+YCBCR_TO_RGB = np.linalg.inv(RGB_TO_YCBCR)
+CHROMA = np.array([0, 128, 128]).reshape(3, 1, 1)
+
+
+def split(rgb, mode='rgb'):
+    """ (H, W, 3) pixels to a (3, H, W) stack of `mode` channels """
+    channels = np.moveaxis(rgb, -1, 0)
+    if mode == 'ycbcr':
+        return np.einsum('ij,jhw->ihw', RGB_TO_YCBCR, channels) + CHROMA
+    return np.ascontiguousarray(channels)
+
+
+def merge(channels, mode='rgb'):
+    """ (3, H, W) stack of `mode` channels back to (H, W, 3) uint8 pixels """
+    if mode == 'ycbcr':
+        channels = np.einsum('ij,jhw->ihw', YCBCR_TO_RGB,
+                             channels.astype(float) - CHROMA)
+    return np.rint(np.moveaxis(channels, 0, -1)).clip(0, 255).astype(np.uint8)
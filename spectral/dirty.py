@@ -0,0 +1,65 @@
+""" Tracking of which part of a spectrum changed since last redraw """
+import numpy as np
+
+TILE = 64
+# past this fraction of all tiles (or bins) a full redraw is cheaper
+MAX_RATIO = 0.5
+
+
+class DirtyRegion:
+    """ Changed bins, kept as a grid of TILE x TILE tiles
+
+        Tiles keep scattered edits (symmetric brush strokes) from
+        blowing up into one huge bounding box.
+    """
+
+    def __init__(self):
+        self.full = True
+        self.grid = None  # bool, one per tile
+
+    def mark(self, ys, xs, shape):
+        """ Bins (ys, xs) of a spectrum of `shape` changed """
+        if self.full or not len(ys):
+            return
+        h, w = shape[-2:]
+        if len(ys) > MAX_RATIO * h * w:
+            # a big mask, it's a full redraw anyway
+            self.mark_all()
+            return
+        tiles = (-(-h // TILE), -(-w // TILE))
+        if self.grid is None or self.grid.shape != tiles:
+            self.grid = np.zeros(tiles, dtype=bool)
+        self.grid[ys // TILE, xs // TILE] = True
+
+    def mark_all(self):
+        self.full = True
+        self.grid = None
+
+    def clear(self):
+        self.full = False
+        self.grid = None
+
+    def rects(self, shape, max_ratio=MAX_RATIO):
+        """ [(y0, y1, x0, x1), ...] to redraw, None if it's all of it
+
+            Runs of tiles in one tile row are merged into one rect.
+            Past `max_ratio` of all tiles a full redraw is cheaper.
+        """
+        h, w = shape[-2:]
+        if self.full:
+            return None
+        grid = self.grid
+        if grid is None:
+            return []
+        if np.count_nonzero(grid) > max_ratio * grid.size:
+            return None
+
+        rects = []
+        for ty in np.flatnonzero(grid.any(axis=1)):
+            # starts and ends of runs of dirty tiles in this row
+            edges = np.flatnonzero(np.diff(np.concatenate(
+                ([False], grid[ty], [False])).astype(np.int8)))
+            y0, y1 = int(ty) * TILE, min((int(ty) + 1) * TILE, h)
+            for start, end in zip(edges[::2].tolist(), edges[1::2].tolist()):
+                rects.append((y0, y1, start * TILE, min(end * TILE, w)))
+        return rects
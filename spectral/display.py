@@ -0,0 +1,35 @@
+""" Spectrum to screen conversion without per-update allocations """
+import numpy as np
+
+FULL = (slice(None), slice(None))
+
+
+class LogMagnitude:
+    """ log2|spectrum| scaled to 0-255, computed in reused buffers """
+    buffer = None
+
+    def render(self, spectrum, out, scale_factor=None, region=FULL):
+        """ Write gray RGB32 pixels of `spectrum[region]` into `out[region]`
+
+            `scale_factor` is the log2 magnitude that maps to 255,
+            taken from the data when None. Returns the one used.
+        """
+        # magnitudes in the real counterpart of the spectrum dtype
+        dtype = np.finfo(spectrum.dtype).dtype
+        if (self.buffer is None or self.buffer.shape != out.shape
+                or self.buffer.dtype != dtype):
+            self.buffer = np.empty(out.shape, dtype=dtype)
+
+        magnitude = self.buffer[region]
+        np.abs(spectrum[region], out=magnitude)
+        with np.errstate(divide='ignore'):
+            np.log2(magnitude, out=magnitude)
+
+        scale_factor = scale_factor or np.max(magnitude)
+        magnitude *= 255 / scale_factor
+        np.clip(magnitude, 0, 255, out=magnitude)
+
+        pixels = out[region]
+        np.copyto(pixels, magnitude, casting='unsafe')
+        pixels *= 0x010101
+        return scale_factor
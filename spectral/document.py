@@ -0,0 +1,209 @@
+""" The image being edited in frequency domain, without any Qt around it """
+import numpy as np
+from numpy.fft import fftshift
+
+from spectral import fft
+from spectral.half import HalfSpectrum
+from spectral.history import History, HISTORY_BYTES
+from spectral.incremental import IncrementalInverse
+from spectral.kernels import composite
+from spectral.masks import apply_mask
+from spectral.noise import blend_spectrum, stripe_peaks
+from spectral.recipe import Recipe, apply_op
+from spectral.resample import resize
+
+
+def spatial_to_array(spatial):
+    """ uint8 for display, clipped """
+    return np.abs(spatial).clip(0, 255).astype(np.uint8)
+
+
+def spatial_to_image(spatial):
+    """ Working image out of an inverse transform, float32 and unclipped """
+    return np.abs(spatial).astype(np.float32)
+
+
+def _channel(channel):
+    """ Index of the channels an edit goes to, all of them for None """
+    return Ellipsis if channel is None else channel
+
+
+class SpectralDocument:
+    """ Image, its spectrum, the original spectrum and edits on them
+
+        Observers get called as observer(event, ys, xs, delta), with
+        event being one of:
+
+        load     new image came in, spectrum is a new one
+        reset    spectrum got replaced (restore, resize, filters, undo)
+        edit     bins at (ys, xs) changed by delta (None if not known)
+
+        Edits done through run() end up in self.recipe, see spectral.recipe.
+        history_bytes=0 turns undo off, saves copies when nobody undoes.
+
+        Color images come in as (C, H, W) stacks and are transformed in
+        one batched call. Edits go to every channel, or only to `channel`.
+    """
+    scale_factor = None
+
+    def __init__(self, half=False, history_bytes=HISTORY_BYTES):
+        self.half = half  # keep rfft2 half only, see spectral.half
+        self.image = None
+        self.spectrum = None
+        self.original = None
+        self.inverse = IncrementalInverse()
+        self.history = History(history_bytes)
+        self.recipe = Recipe()
+        self.undone = []  # ops undone, for redo
+        self.observers = []
+
+    def observe(self, observer):
+        self.observers.append(observer)
+
+    def notify(self, event, ys=None, xs=None, delta=None):
+        for observer in self.observers:
+            observer(event, ys, xs, delta)
+
+    @property
+    def shape(self):
+        """ (H, W) of the spectrum plane, channels left out """
+        return None if self.spectrum is None else self.spectrum.shape[-2:]
+
+    @property
+    def channels(self):
+        """ Number of channels, None for a 2D gray image """
+        if self.spectrum is None or len(self.spectrum.shape) == 2:
+            return None
+        return self.spectrum.shape[0]
+
+    def forward(self, image):
+        """ Centered spectrum of `image`, touches no state """
+        if self.half:
+            return HalfSpectrum.from_array(image)
+        return fftshift(fft.fft2(image), axes=(-2, -1))
+
+    def load(self, image, flush=False, spectrum=None):
+        """ Take a new image, `spectrum` if it's already been computed """
+        if spectrum is None:
+            spectrum = self.forward(image)
+        if self.spectrum is None or flush:
+            self.original = spectrum.copy()
+            # brightest bin in log2, what stroke levels are relative to
+            magnitude = np.abs(getattr(spectrum, 'data', spectrum)).max()
+            self.scale_factor = np.log2(magnitude)
+            self.recipe = Recipe()
+            self.undone = []
+
+        self.image = image
+        self.spectrum = spectrum
+        self.history.clear()
+        self.notify('load')
+
+    def apply_mask(self, mask, value=0x00, channel=None):
+        ys, xs = np.nonzero(mask)
+        self.history.record(self.spectrum, ys, xs)
+        apply_mask(self.spectrum, mask, value, _channel(channel))
+        self.notify('edit', ys, xs)
+
+    def apply_kernel(self, kernel, channel=None):
+        """ Multiply the whole spectrum with `kernel`, see spectral.kernels """
+        self.history.record_all(self.spectrum)
+        if isinstance(self.spectrum, HalfSpectrum):
+            self.spectrum.multiply(kernel, _channel(channel))
+        else:
+            self.spectrum[_channel(channel)] *= kernel
+        self.notify('reset')
+
+    def apply_filters(self, specs, channel=None):
+        h, w = self.shape
+        self.apply_kernel(composite(specs, w, h), channel)
+
+    def paint(self, ys, xs, values, channel=None):
+        self.history.record(self.spectrum, ys, xs)
+        old = self.spectrum[..., ys, xs]
+        self.spectrum[_channel(channel), ys, xs] = values
+        self.notify('edit', ys, xs, self.spectrum[..., ys, xs] - old)
+
+    def restore(self):
+        self.history.record_all(self.spectrum)
+        self.spectrum = self.original.copy()
+        self.notify('reset')
+
+    def add_stripes(self, thickness, spacing, angle, opacity, value=0,
+                    channel=None):
+        """ Stripes blended into the image, done on the spectrum,
+            see spectral.noise.stripe_peaks for how they get snapped to bins
+        """
+        full = np.asarray(self.spectrum)
+        peaks = stripe_peaks(self.shape, thickness, spacing, angle)
+        spectrum = full.copy()
+        index = _channel(channel)
+        spectrum[index] = blend_spectrum(full[index], peaks, opacity, value)
+        if self.half:
+            spectrum = HalfSpectrum.from_full(spectrum)
+        self.history.record_all(self.spectrum)
+        self.spectrum = spectrum
+        self.notify('reset')
+
+    def resize(self, factor, window=None, smooth=False):
+        """ Crop or pad the spectrum, see spectral.resample """
+        if factor == 1.0 and window is None:
+            return
+        spectrum = resize(np.asarray(self.spectrum), factor, window, smooth)
+        if self.half:
+            spectrum = HalfSpectrum.from_full(spectrum)
+        self.history.record_all(self.spectrum)
+        self.spectrum = spectrum
+        self.notify('reset')
+
+    def run(self, op):
+        """ Apply a recipe op and keep it in self.recipe """
+        apply_op(self, op)
+        self.recipe.append(op)
+        self.undone = []
+
+    def undo(self):
+        if not self._step(self.history.undo):
+            return False
+        if len(self.recipe):
+            self.undone.append(self.recipe.ops.pop())
+        return True
+
+    def redo(self):
+        if not self._step(self.history.redo):
+            return False
+        if self.undone:
+            self.recipe.append(self.undone.pop())
+        return True
+
+    def _step(self, step):
+        result = step(self.spectrum)
+        if result is None:
+            return False
+
+        self.spectrum, changed = result
+        if changed is None:
+            self.notify('reset')
+        else:
+            self.notify('edit', *changed)
+        return True
+
+    def render(self, spectrum=None, changed=None):
+        """ Image out of the spectrum, patched in place when `changed`
+
+            `spectrum` is a snapshot to use instead of self.spectrum,
+            so this can run on another thread while edits go on.
+            changed: (ys, xs, delta) since the last render, or None.
+            Calls have to come one at a time.
+        """
+        spectrum = self.spectrum if spectrum is None else spectrum
+        if isinstance(spectrum, HalfSpectrum):
+            self.image = spatial_to_image(spectrum.inverse())
+            return self.image
+
+        if changed is None:
+            self.inverse.reset(spectrum)
+        else:
+            self.inverse.update(spectrum, *changed)
+        self.image = spatial_to_image(self.inverse.spatial)
+        return self.image
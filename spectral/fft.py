@@ -0,0 +1,245 @@
+""" FFT engine, picks the fastest backend that's installed.
+
+    pyFFTW > scipy.fft > numpy.fft. pyFFTW plans are built once per
+    (kind, shape, dtype) and reused, the same image gets transformed
+    over and over again while painting.
+
+    Precision is a policy too: 'single' keeps every spectrum complex64
+    (half the memory and bandwidth), 'double' complex128. Whatever comes
+    in gets cast once here, so buffers down the line stay one dtype.
+"""
+import os
+
+import numpy as np
+
+THREADS = os.cpu_count() or 1
+
+# name: (real dtype, complex dtype)
+PRECISIONS = {
+    'single': (np.float32, np.complex64),
+    'double': (np.float64, np.complex128),
+}
+_precision = None
+
+
+class NumpyBackend:
+    name = 'numpy'
+    real_input = False  # fft2 of real arrays isn't any faster
+
+    def fft2(self, array):
+        return np.fft.fft2(array)
+
+    def ifft2(self, array):
+        return np.fft.ifft2(array)
+
+    def rfft2(self, array):
+        return np.fft.rfft2(array)
+
+    def irfft2(self, array, shape):
+        return np.fft.irfft2(array, s=shape)
+
+    def fft(self, array, axis):
+        return np.fft.fft(array, axis=axis)
+
+    def ifft(self, array, axis):
+        return np.fft.ifft(array, axis=axis)
+
+    def rfft(self, array, axis):
+        return np.fft.rfft(array, axis=axis)
+
+    def irfft(self, array, n, axis):
+        return np.fft.irfft(array, n, axis=axis)
+
+
+class ScipyBackend:
+    name = 'scipy'
+    real_input = True  # fft2 takes real arrays the fast way itself
+
+    def __init__(self):
+        import scipy.fft
+        self.scipy = scipy.fft
+
+    def fft2(self, array):
+        return self.scipy.fft2(array, workers=THREADS)
+
+    def ifft2(self, array):
+        return self.scipy.ifft2(array, workers=THREADS)
+
+    def rfft2(self, array):
+        return self.scipy.rfft2(array, workers=THREADS)
+
+    def irfft2(self, array, shape):
+        return self.scipy.irfft2(array, s=shape, workers=THREADS)
+
+    def fft(self, array, axis):
+        return self.scipy.fft(array, axis=axis, workers=THREADS)
+
+    def ifft(self, array, axis):
+        return self.scipy.ifft(array, axis=axis, workers=THREADS)
+
+    def rfft(self, array, axis):
+        return self.scipy.rfft(array, axis=axis, workers=THREADS)
+
+    def irfft(self, array, n, axis):
+        return self.scipy.irfft(array, n, axis=axis, workers=THREADS)
+
+
+class FFTWBackend:
+    name = 'pyfftw'
+    real_input = True
+
+    def __init__(self):
+        import pyfftw
+        import pyfftw.builders
+        self.pyfftw = pyfftw
+        self.plans = {}
+
+    def _plan(self, kind, array, **kwargs):
+        key = (kind, array.shape, array.dtype.str,
+               tuple(sorted(kwargs.items())))
+        plan = self.plans.get(key)
+        if plan is None:
+            buf = self.pyfftw.empty_aligned(array.shape, dtype=array.dtype)
+            builder = getattr(self.pyfftw.builders, kind)
+            plan = builder(buf, threads=THREADS, **kwargs)
+            self.plans[key] = plan
+        # output is the plan's own buffer, next call would overwrite it
+        return plan(array).copy()
+
+    def fft2(self, array):
+        return self._plan('fft2', array)
+
+    def ifft2(self, array):
+        return self._plan('ifft2', array)
+
+    def rfft2(self, array):
+        return self._plan('rfft2', array)
+
+    def irfft2(self, array, shape):
+        return self._plan('irfft2', array, s=tuple(shape))
+
+    def fft(self, array, axis):
+        return self._plan('fft', array, axis=axis)
+
+    def ifft(self, array, axis):
+        return self._plan('ifft', array, axis=axis)
+
+    def rfft(self, array, axis):
+        return self._plan('rfft', array, axis=axis)
+
+    def irfft(self, array, n, axis):
+        return self._plan('irfft', array, n=n, axis=axis)
+
+
+backends = [FFTWBackend, ScipyBackend, NumpyBackend]
+_backend = None
+
+
+def set_backend(name=None):
+    """ Switch to backend called `name`, or the best available one """
+    global _backend
+    for backend in backends:
+        if name is not None and backend.name != name:
+            continue
+        try:
+            _backend = backend()
+        except ImportError:
+            continue
+        return _backend
+    raise ValueError("FFT backend {} is not available".format(name))
+
+
+def get_backend():
+    return _backend or set_backend(os.environ.get('FOURIERISM_FFT'))
+
+
+def set_precision(name):
+    """ 'single' or 'double', for every transform from now on """
+    global _precision
+    if name not in PRECISIONS:
+        raise ValueError("unknown precision {!r}".format(name))
+    _precision = name
+    return name
+
+
+def get_precision():
+    return _precision or set_precision(
+        os.environ.get('FOURIERISM_PRECISION', 'double'))
+
+
+def real_dtype():
+    return PRECISIONS[get_precision()][0]
+
+
+def complex_dtype():
+    return PRECISIONS[get_precision()][1]
+
+
+def hermitian_expand(half, shape):
+    """ Rebuild full fft2 output out of rfft2 half spectrum
+
+        Works on the last two axes, leading ones (channels) come along.
+    """
+    h, w = shape[-2:]
+    full = np.empty(half.shape[:-1] + (w,), dtype=half.dtype)
+    hw = half.shape[-1]
+    full[..., :hw] = half
+
+    # bin (r, c) is conj of (-r % h, w - c): columns reversed, and rows
+    # reversed except row 0, plain slices, no gathers
+    cols = slice(w - hw, 0, -1)
+    np.conjugate(half[..., 0, cols], out=full[..., 0, hw:])
+    np.conjugate(half[..., :0:-1, cols], out=full[..., 1:, hw:])
+    return full
+
+
+def fft2(array):
+    """ fft2 over the last two axes, so (C, H, W) stacks go in one call
+
+        Real input stays real for backends that make use of it, the
+        rest get it through rfft2, which is about twice as cheap.
+    """
+    backend = get_backend()
+    if np.isrealobj(array):
+        if backend.real_input:
+            real = np.asarray(array).astype(real_dtype(), copy=False)
+            return _complex(backend.fft2(real))
+        return hermitian_expand(rfft2(array), array.shape)
+    return _complex(backend.fft2(_complex(array)))
+
+
+def ifft2(array):
+    return _complex(get_backend().ifft2(_complex(array)))
+
+
+def rfft2(array):
+    array = np.asarray(array).astype(real_dtype(), copy=False)
+    return _complex(get_backend().rfft2(array))
+
+
+def irfft2(array, shape):
+    result = get_backend().irfft2(_complex(array), shape)
+    return result.astype(real_dtype(), copy=False)
+
+
+def fft(array, axis=-1):
+    """ 1D transforms along `axis`, for row-column passes over strips """
+    return _complex(get_backend().fft(_complex(array), axis))
+
+
+def ifft(array, axis=-1):
+    return _complex(get_backend().ifft(_complex(array), axis))
+
+
+def rfft(array, axis=-1):
+    array = np.asarray(array).astype(real_dtype(), copy=False)
+    return _complex(get_backend().rfft(array, axis))
+
+
+def irfft(array, n, axis=-1):
+    result = get_backend().irfft(_complex(array), n, axis)
+    return result.astype(real_dtype(), copy=False)
+
+
+def _complex(array):
+    return np.asarray(array).astype(complex_dtype(), copy=False)
@@ -0,0 +1,107 @@
+""" Half spectrum storage for real images.
+
+    The spectrum of a real image is Hermitian, F[-k] == conj(F[k]), so
+    rfft2 output holds everything there is to know. HalfSpectrum keeps
+    only that, but pretends to be the full fftshift-ed spectrum, so code
+    written against the centered view (brushes, masks, symmetry painting)
+    can keep on indexing it the same way.
+"""
+import numpy as np
+from numpy.fft import fftshift, ifftshift
+
+from spectral import fft
+
+
+AXES = (-2, -1)
+
+
+class HalfSpectrum:
+    """ Leading axes (color channels) are carried along, indexing takes
+        an optional channel in front of the bin coordinates.
+    """
+
+    def __init__(self, data, shape):
+        self.data = data
+        self.shape = tuple(shape)
+        self.dtype = data.dtype
+
+    @property
+    def plane(self):
+        return self.shape[-2:]
+
+    @classmethod
+    def from_array(cls, array):
+        return cls(fft.rfft2(array), array.shape)
+
+    @classmethod
+    def from_full(cls, full):
+        """ Drop the redundant half of a centered full spectrum """
+        w = full.shape[-1]
+        return cls(ifftshift(full, axes=AXES)[..., :w // 2 + 1].copy(),
+                   full.shape)
+
+    def copy(self):
+        return HalfSpectrum(self.data.copy(), self.shape)
+
+    def full(self):
+        """ Full centered spectrum, same as utils.array_to_fft would give """
+        return fftshift(fft.hermitian_expand(self.data, self.shape),
+                        axes=AXES)
+
+    def __array__(self, dtype=None, copy=None):
+        full = self.full()
+        return full if dtype is None else full.astype(dtype)
+
+    def multiply(self, kernel, channel=Ellipsis):
+        """ In place product with a centered, point symmetric kernel """
+        self.data[channel] *= ifftshift(kernel)[:, :self.data.shape[-1]]
+
+    def inverse(self):
+        return fft.irfft2(self.data, self.plane)
+
+    def locate(self, ys, xs):
+        """ Map centered full view coordinates onto self.data
+
+            Returns rows, cols and a flag telling which values
+            live there conjugated.
+        """
+        h, w = self.plane
+        k1 = (np.asarray(ys) - h // 2) % h
+        k2 = (np.asarray(xs) - w // 2) % w
+        conj = k2 > w // 2
+        rows = np.where(conj, -k1 % h, k1)
+        cols = np.where(conj, w - k2, k2)
+        return rows, cols, conj
+
+    def mirror(self, ys, xs):
+        """ Centered coordinates of the bins conjugate to (ys, xs) """
+        h, w = self.plane
+        return (2 * (h // 2) - ys) % h, (2 * (w // 2) - xs) % w
+
+    def _split(self, key):
+        """ Channel part of an index, and bin coordinates out of the rest """
+        if not isinstance(key, tuple):
+            key = (key,)
+        if isinstance(key[-1], np.ndarray) and key[-1].dtype == bool:
+            lead, coords = key[:-1], np.nonzero(key[-1])
+        else:
+            lead, coords = key[:-2], key[-2:]
+            if all(isinstance(k, slice) for k in coords):
+                ys, xs = (range(*k.indices(n))
+                          for k, n in zip(coords, self.plane))
+                coords = np.ix_(ys, xs)
+        return lead or (Ellipsis,), coords
+
+    def __getitem__(self, key):
+        lead, coords = self._split(key)
+        rows, cols, conj = self.locate(*coords)
+        values = self.data[lead + (rows, cols)]
+        return np.where(conj, np.conj(values), values)
+
+    def __setitem__(self, key, values):
+        lead, coords = self._split(key)
+        rows, cols, conj = self.locate(*coords)
+        index = lead + (rows, cols)
+        values = np.broadcast_to(np.asarray(values, dtype=self.dtype),
+                                 self.data[index].shape)
+        self.data[index] = np.where(conj, np.conj(values), values)
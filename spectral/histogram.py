@@ -0,0 +1,70 @@
+""" Gray level histogram kept up to date with the display conversion
+
+    The working image has to be turned into uint8 for the screen anyway,
+    so the counts get done in the same pass, one cache sized block of
+    rows at a time, with counts kept per block. Blocks that come out the
+    same as last time are left alone. In a block with a few changed
+    pixels only those move between levels, old value out, new one in.
+    So a localized edit costs a compare of the image and bincounts of
+    just the part that changed.
+"""
+import numpy as np
+
+from spectral.document import spatial_to_array
+
+# rows per block, about what fits in L2 for common widths
+BLOCK_BYTES = 256 * 2**10
+LEVELS = 256
+
+
+class DisplayHistogram:
+    """ uint8 display image and its level counts, updated together """
+    display = None
+    blocks = None  # counts per block of rows, (blocks, LEVELS)
+
+    def _reset(self, shape, rows):
+        self.display = np.zeros(shape, dtype=np.uint8)
+        self.rows = rows
+        self.blocks = np.zeros((-(-shape[0] // rows), LEVELS),
+                               dtype=np.int64)
+        self.blocks[:, 0] = [self.display[top:top + rows].size
+                             for top in range(0, shape[0], rows)]
+
+    def update(self, array):
+        """ Convert `array` for display, returns self.display
+
+            Converted by spatial_to_array, block by block.
+            self.display is reused, take a copy to keep an old one.
+        """
+        h, w = array.shape
+        if self.display is None or self.display.shape != array.shape:
+            self._reset(array.shape,
+                        max(1, BLOCK_BYTES // (w * array.itemsize)))
+        rows = self.rows
+
+        block = np.empty((rows, w), dtype=np.uint8)
+        for i, top in enumerate(range(0, h, rows)):
+            new = block[:min(rows, h - top)]
+            new[...] = spatial_to_array(array[top:top + rows])
+            old = self.display[top:top + rows]
+            changed = old != new
+            count = np.count_nonzero(changed)
+            if not count:
+                continue
+            if count * 2 < changed.size:
+                # a few pixels changed, move just them between levels
+                self.blocks[i] -= np.bincount(old[changed], minlength=LEVELS)
+                self.blocks[i] += np.bincount(new[changed], minlength=LEVELS)
+            else:
+                self.blocks[i] = np.bincount(new.ravel(), minlength=LEVELS)
+            old[...] = new
+        return self.display
+
+    @property
+    def counts(self):
+        return self.blocks.sum(axis=0)
+
+    @property
+    def frequencies(self):
+        """ Counts as fractions of all pixels """
+        return self.counts / max(1, self.display.size)
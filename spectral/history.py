@@ -0,0 +1,116 @@
+""" Undo/redo for spectrum edits
+
+    Small edits (brush strokes, masks on a few bins) are kept as sparse
+    entries: flat indices and the values that were there before. Undo
+    swaps those with what's in the spectrum now, so the same entry is
+    good for redo, and both cost as much as the edit did. Edits that
+    replace the whole spectrum (filters, resize, restore) or would make
+    a sparse entry bigger than the spectrum itself keep a full copy.
+"""
+import warnings
+from collections import deque
+
+import numpy as np
+
+HISTORY_BYTES = 256 * 2**20
+
+
+class Delta:
+    """ Bins (ys, xs) across all channels, `shape` is the (H, W) plane """
+
+    def __init__(self, shape, ys, xs, values):
+        self.shape = shape
+        self.index = np.ravel_multi_index((ys, xs), shape).astype(np.int32)
+        self.values = values
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.values.nbytes
+
+    def swap(self, spectrum):
+        """ Put stored values back, keep the current ones instead """
+        ys, xs = np.unravel_index(self.index, self.shape)
+        current = spectrum[..., ys, xs]
+        spectrum[..., ys, xs] = self.values
+        self.values = current
+        return spectrum, (ys, xs, spectrum[..., ys, xs] - current)
+
+
+class Checkpoint:
+    def __init__(self, spectrum):
+        self.spectrum = spectrum
+
+    @property
+    def nbytes(self):
+        spectrum = self.spectrum
+        return getattr(spectrum, 'data', spectrum).nbytes
+
+    def swap(self, spectrum):
+        self.spectrum, spectrum = spectrum, self.spectrum
+        return spectrum, None
+
+
+class History:
+    """ Two stacks of edits, oldest ones dropped past max_bytes """
+
+    def __init__(self, max_bytes=HISTORY_BYTES):
+        self.max_bytes = max_bytes
+        self.clear()
+
+    def clear(self):
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.nbytes = 0  # of both stacks, kept as entries come and go
+
+    def _push(self, entry):
+        self.nbytes -= sum(e.nbytes for e in self.redo_stack)
+        self.redo_stack = []
+        self.undo_stack.append(entry)
+        self.nbytes += entry.nbytes
+        while self.undo_stack and self.nbytes > self.max_bytes:
+            self.nbytes -= self.undo_stack.popleft().nbytes
+
+    def record(self, spectrum, ys, xs):
+        """ Bins (ys, xs) of `spectrum` are about to change """
+        if not self.max_bytes:
+            return
+        plane = spectrum.shape[-2:]
+        channels = int(np.prod(spectrum.shape[:-2]))
+        # int32 index + values per bin against just the values per bin
+        itemsize = np.dtype(spectrum.dtype).itemsize * channels
+        if len(ys) * (4 + itemsize) >= plane[0] * plane[1] * itemsize:
+            self.record_all(spectrum)
+        else:
+            self._push(Delta(plane, ys, xs, spectrum[..., ys, xs]))
+
+    def record_all(self, spectrum):
+        """ Whole `spectrum` is about to be replaced or changed """
+        if not self.max_bytes:
+            return
+        nbytes = Checkpoint(spectrum).nbytes
+        if nbytes > self.max_bytes:
+            # it would be dropped right away, and everything older with it
+            warnings.warn("spectrum of {} MB doesn't fit in {} MB of "
+                          "history, undo is lost".format(
+                              nbytes // 2**20, self.max_bytes // 2**20))
+            self.clear()
+            return
+        self._push(Checkpoint(spectrum.copy()))
+
+    def undo(self, spectrum):
+        """ (previous spectrum, (ys, xs, delta) or None) or None """
+        return self._swap(spectrum, self.undo_stack, self.redo_stack)
+
+    def redo(self, spectrum):
+        return self._swap(spectrum, self.redo_stack, self.undo_stack)
+
+    def _swap(self, spectrum, source, target):
+        if not source:
+            return None
+        entry = source.pop()
+        target.append(entry)
+        # a checkpoint ends up holding the current spectrum, maybe resized
+        self.nbytes -= entry.nbytes
+        result = entry.swap(spectrum)
+        self.nbytes += entry.nbytes
+        return result
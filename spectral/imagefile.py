@@ -0,0 +1,120 @@
+""" Reading and writing images at full bit depth, with Pillow
+
+    Working images are float32 in 8 bit units (0..255), whatever the
+    file had: 16 bit values get divided by 257, 32 bit integers by
+    (2**31 - 1) / 255, so recipes, stroke levels and the display treat
+    every depth the same, and writing multiplies them back. Depth 32 is
+    float32, kept as it is, INT32 the 32 bit integer one. Only gray
+    images keep more than 8 bits on saving, Pillow has no 16 bit RGB,
+    though high depth ones get scaled down right when read as color.
+    .npy files hold the float32 working image as it is.
+"""
+import os
+
+import numpy as np
+
+from spectral import color
+
+INT32 = 'int32'  # depth of 32 bit integer images, 32 is float
+
+# bit depth: extensions able to store it, 8 bit goes anywhere
+DEPTH_EXTENSIONS = {
+    16: ('.png', '.tif', '.tiff'),
+    32: ('.tif', '.tiff'),
+    INT32: ('.tif', '.tiff'),
+}
+HIGH_MODES = {'I;16': 16, 'I;16B': 16, 'I;16L': 16, 'I': INT32, 'F': 32}
+# what a Pillow mode's values get divided by to end up in 8 bit units
+MODE_SCALES = {'I;16': 257, 'I;16B': 257, 'I;16L': 257,
+               'I': (2**31 - 1) / 255}
+
+
+def _mode(image):
+    """ Pillow mode, with 16 bit PNGs opened as 'I' by older Pillow
+        taken for what they are, PNG has no 32 bit integers
+    """
+    if image.mode == 'I' and image.format == 'PNG':
+        return 'I;16'
+    return image.mode
+
+
+def image_depth(image):
+    """ Bit depth of an opened Pillow image """
+    return HIGH_MODES.get(_mode(image), 8)
+
+
+def image_scale(image):
+    """ Divisor taking an opened Pillow image's values to 8 bit units """
+    return MODE_SCALES.get(_mode(image), 1)
+
+
+def depth(path):
+    """ Bit depth read() would give, without decoding the pixels """
+    if path.lower().endswith('.npy'):
+        return 32
+    from PIL import Image
+
+    return image_depth(Image.open(path))
+
+
+def read(path, mode='gray'):
+    """ (float32 array, bit depth) of the image at `path`
+
+        `mode` is one of spectral.color.MODES, color comes as (3, H, W).
+    """
+    if path.lower().endswith('.npy'):
+        return np.load(path).astype(np.float32), 32
+    from PIL import Image
+
+    image = Image.open(path)
+    depth = image_depth(image)
+    if mode != 'gray':
+        if depth == 8:
+            rgb = np.asarray(image.convert('RGB'))
+        else:
+            # convert('RGB') would clip these at 255 instead of scaling
+            gray = _scaled(image)
+            rgb = np.repeat(gray[..., None], 3, axis=-1)
+        return color.split(rgb, mode).astype(np.float32), 8
+
+    if depth == 8:
+        return np.asarray(image.convert('L'), dtype=np.float32), 8
+    return _scaled(image), depth
+
+
+def _scaled(image):
+    """ High depth gray Pillow image in 8 bit units, float32 """
+    array = np.asarray(image, dtype=np.float32)
+    scale = image_scale(image)
+    if scale != 1:
+        array /= scale
+    return array
+
+
+def to_depth(array, depth):
+    """ Working image as integers of `depth` bits, float32 for 32 """
+    if depth == 32:
+        return array.astype(np.float32)
+    if depth == INT32:
+        values = np.rint(array.astype(np.float64) * MODE_SCALES['I'])
+        return values.clip(-2**31, 2**31 - 1).astype(np.int32)
+    if depth == 16:
+        return np.rint(array * 257).clip(0, 2**16 - 1).astype(np.uint16)
+    return np.rint(array).clip(0, 255).astype(np.uint8)
+
+
+def write(path, array, depth=8, mode='gray'):
+    """ Save a working image, at `depth` if the format can take it """
+    if path.lower().endswith('.npy'):
+        np.save(path, array.astype(np.float32))
+        return
+    from PIL import Image
+
+    if mode != 'gray':
+        Image.fromarray(color.merge(array, mode)).save(path)
+        return
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in DEPTH_EXTENSIONS.get(depth, ()):
+        depth = 8
+    Image.fromarray(to_depth(array, depth)).save(path)
@@ -0,0 +1,57 @@
+""" Incremental inverse transform for small spectrum edits.
+
+    Changing k bins of a spectrum changes its inverse by the sum of k
+    complex sinusoids. Bins touched by a brush sit in few rows and columns,
+    so the sum is done as (M x r) @ (r x c) @ (c x N), costing about
+    M*N*min(r, c), against M*N*log2(M*N) for a whole new ifft2.
+    Leading (channel) axes go through the same products broadcast.
+"""
+import numpy as np
+
+from spectral import fft
+
+# how many log2(M*N)'s worth of rows/columns are still cheaper than ifft2
+COST_FACTOR = 2
+
+
+class IncrementalInverse:
+    """ Keeps ifft2 of a spectrum around and patches it on small edits """
+    spatial = None
+
+    def reset(self, spectrum):
+        self.spatial = fft.ifft2(spectrum)
+
+    def update(self, spectrum, ys, xs, delta):
+        """ Apply `delta` at bins (ys, xs), full ifft2 if that's cheaper
+
+            `spectrum` has to have the delta applied already.
+            Returns True if the cached image got patched in place.
+        """
+        if self.spatial is None or self.spatial.shape != spectrum.shape:
+            self.reset(spectrum)
+            return False
+
+        m, n = spectrum.shape[-2:]
+        rows, r_idx = np.unique(ys, return_inverse=True)
+        cols, c_idx = np.unique(xs, return_inverse=True)
+        if min(len(rows), len(cols)) > COST_FACTOR * np.log2(m * n):
+            self.reset(spectrum)
+            return False
+
+        delta = np.asarray(delta)
+        dtype = self.spatial.dtype
+        patch = np.zeros(delta.shape[:-1] + (len(rows), len(cols)),
+                         dtype=dtype)
+        np.add.at(patch, (Ellipsis, r_idx, c_idx), delta)
+        patch /= m * n
+
+        # angles modulo the period first, single precision loses it on
+        # big products
+        ey = np.exp(2j * np.pi / m * (np.outer(np.arange(m), rows) % m))
+        ex = np.exp(2j * np.pi / n * (np.outer(cols, np.arange(n)) % n))
+        ey, ex = ey.astype(dtype, copy=False), ex.astype(dtype, copy=False)
+        if len(rows) <= len(cols):
+            self.spatial += ey @ (patch @ ex)
+        else:
+            self.spatial += (ey @ patch) @ ex
+        return True
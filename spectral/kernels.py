@@ -0,0 +1,85 @@
+""" Smooth filters, applied by multiplying the spectrum with a kernel
+
+    A filter is a hashable spec tuple:
+
+    ('gaussian', cutoff, high)
+    ('butterworth', cutoff, high, order)
+    ('radial', gains, max_radius)     gains sampled evenly on 0..max_radius
+    ('band', profile, diam1, diam2, inverse)
+
+    Radii are in bins from the center. Kernels are cached per
+    (spec, w, h), and so are composites of several of them, so a chain
+    of filters costs a single multiply.
+"""
+import numpy as np
+
+from spectral.masks import ByteCache, radius2
+
+KERNEL_CACHE_BYTES = 512 * 2**20
+BUTTERWORTH_ORDER = 2
+PROFILES = ['hard', 'gaussian', 'butterworth']
+
+kernels = ByteCache(KERNEL_CACHE_BYTES)
+
+
+def _lowpass(profile, cutoff, r2, order=BUTTERWORTH_ORDER):
+    c2 = max(cutoff, 1e-6)**2
+    with np.errstate(over='ignore'):
+        if profile == 'gaussian':
+            return np.exp(r2 / (-2 * c2))
+        return 1 / (1 + (r2 / c2)**order)
+
+
+def _make(spec, w, h):
+    return response(spec, radius2(w, h).astype(np.float32))
+
+
+def response(spec, r2):
+    """ Gain of filter `spec` at squared radii `r2`, uncached """
+    kind, *params = spec
+    if kind in ('gaussian', 'butterworth'):
+        cutoff, high, *order = params
+        gain = _lowpass(kind, cutoff, r2, *order)
+        return 1 - gain if high else gain
+
+    if kind == 'radial':
+        gains, max_radius = params
+        radii = np.linspace(0, max_radius, len(gains))
+        return np.interp(np.sqrt(r2), radii, gains).astype(np.float32)
+
+    if kind == 'band':
+        profile, diam1, diam2, inverse = params
+        gain = (1 - _lowpass(profile, diam1, r2)) * _lowpass(profile, diam2, r2)
+        return 1 - gain if inverse else gain
+
+    raise ValueError("unknown filter {!r}".format(kind))
+
+
+def kernel(spec, w, h):
+    return kernels.get((spec, w, h), lambda: _make(spec, w, h))
+
+
+def composite(specs, w, h):
+    """ Product of all kernels in `specs`, as one cached array """
+    specs = tuple(specs)
+    if len(specs) == 1:
+        return kernel(specs[0], w, h)
+
+    def make():
+        result = np.ones((h, w), dtype=np.float32)
+        for spec in specs:
+            result *= kernel(spec, w, h)
+        return result
+    return kernels.get((specs, w, h), make)
+
+
+def pass_filter(profile, diameter, low):
+    """ Spec for what PassFilterDialog / round_mask do, smoothly """
+    if profile == 'butterworth':
+        return (profile, diameter, not low, BUTTERWORTH_ORDER)
+    return (profile, diameter, not low)
+
+
+def band_filter(profile, diam1, diam2, inverse):
+    """ Spec for what BandpassDialog / band_mask do, smoothly """
+    return ('band', profile, diam1, diam2, inverse)
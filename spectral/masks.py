@@ -0,0 +1,95 @@
+""" Frequency masks, same ones the filter dialogs draw """
+from collections import OrderedDict
+
+import numpy as np
+
+GRID_CACHE_BYTES = 512 * 2**20
+
+
+class ByteCache:
+    """ Arrays by key, least recently used go once over max_bytes """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.arrays = OrderedDict()
+        self.nbytes = 0
+
+    def get(self, key, make):
+        """ Cached array for `key`, make() builds it when missing """
+        array = self.arrays.get(key)
+        if array is not None:
+            self.arrays.move_to_end(key)
+            return array
+
+        array = make()
+        array.setflags(write=False)
+        if array.nbytes <= self.max_bytes:
+            self.arrays[key] = array
+            self.nbytes += array.nbytes
+            while self.nbytes > self.max_bytes:
+                _, old = self.arrays.popitem(last=False)
+                self.nbytes -= old.nbytes
+        return array
+
+    def clear(self):
+        self.arrays.clear()
+        self.nbytes = 0
+
+
+grids = ByteCache(GRID_CACHE_BYTES)
+
+
+def radius2(w, h):
+    """ Squared distances from the spectrum center, cached per (w, h) """
+    def make():
+        x = w // 2
+        y = h // 2
+        # int32 as long as the corners fit, past ~46341 a side they don't
+        dtype = np.int32 if x**2 + y**2 < 2**31 else np.int64
+        a, b = np.ogrid[-y:h - y, -x:w - x]
+        return (a**2).astype(dtype) + (b**2).astype(dtype)
+    return grids.get((w, h), make)
+
+
+def _out(out, w, h):
+    if out is None or out.shape != (h, w):
+        return np.empty((h, w), dtype=bool)
+    return out
+
+
+def round_mask(diameter, w, h, center=None, low=False, out=None):
+    """ `out` is a bool buffer to reuse, a new one if it doesn't fit """
+    return circle_mask(radius2(w, h), diameter, low, _out(out, w, h))
+
+
+def band_mask(diam1, diam2, w, h, inverse=False, out=None):
+    return ring_mask(radius2(w, h), diam1, diam2, inverse, _out(out, w, h))
+
+
+def circle_mask(circle, diameter, low=False, out=None):
+    """ round_mask on squared radii `circle` of any bins, not a full grid """
+    if low:
+        return np.greater(circle, diameter**2, out=out)
+    else:
+        return np.less_equal(circle, diameter**2, out=out)
+
+
+def ring_mask(circle, diam1, diam2, inverse=False, out=None):
+    """ band_mask on squared radii `circle` """
+    if inverse:
+        out = np.greater(circle, diam1**2, out=out)
+        out &= circle < diam2**2
+    else:
+        out = np.less(circle, diam1**2, out=out)
+        out |= circle > diam2**2
+    return out
+
+
+def apply_mask(spectrum, mask, value=0x00, channel=Ellipsis):
+    """ Flatten masked bins of `spectrum` to 2**value, in place
+
+        2D `mask` goes across all channels of a (C, H, W) spectrum,
+        or just the `channel` one.
+    """
+    spectrum[channel, mask] = 2**value
+    return spectrum
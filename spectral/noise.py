@@ -0,0 +1,186 @@
+""" Noise patterns as arrays, blended into the working image
+
+    Every pattern is a coverage array, 0..1 per pixel, built with
+    broadcasting instead of painting shape after shape. blend() lays it
+    over an image: pixels go towards `value` (a gray level, or an array
+    of them like a random texture) as far as coverage * opacity says.
+
+    Stripes are periodic, so their spectrum is just a few peaks.
+    stripe_peaks() gives those, and blend_spectrum() does the same blend
+    straight on a spectrum, without going through an image at all. For
+    stripes at 0 or 90 degrees with a period dividing the image side
+    that's exactly blend(image, stripes(...)). Otherwise the period and
+    angle get snapped to the nearest ones landing on bins, which moves
+    the stripes against the dialog's (so compare them by eye, not pixel
+    by pixel), and tilted ones cross pixels off the sampled profile:
+    against stripes drawn at the snapped period and angle, at opacity
+    0.7, that's a mean of ~3 gray levels, up to ~30 along the edges.
+
+    Custom tiles never get repeated into an image sized array, the image
+    is viewed as a grid of tile sized cells instead and the tile
+    broadcast over all of them.
+"""
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from spectral.masks import ByteCache
+
+TILE_CACHE_BYTES = 64 * 2**20
+
+tiles = ByteCache(TILE_CACHE_BYTES)
+
+
+def _axes(shape):
+    h, w = shape
+    return (np.arange(h, dtype=np.float32)[:, None],
+            np.arange(w, dtype=np.float32)[None, :])
+
+
+def squares(shape, width, height, spacing):
+    """ Grid of width x height squares, `spacing` apart, from (0, 0) """
+    h, w = shape
+    rows = np.arange(h) % (height + spacing) < height
+    cols = np.arange(w) % (width + spacing) < width
+    return (rows[:, None] & cols[None, :]).astype(np.float32)
+
+
+def _stripe_phase(angle):
+    """ Unit normal (y, x) of stripes going along `angle` (degrees) """
+    rad = np.radians(angle)
+    return np.cos(rad), np.sin(rad)
+
+
+def _stripe_profile(position, thickness, period):
+    """ Coverage at `position` along the stripes' normal, in place """
+    # distance from the nearest stripe center
+    distance = np.remainder(position, period, out=position)
+    np.minimum(distance, period - distance, out=distance)
+    coverage = np.subtract(np.float32(thickness / 2 + 0.5), distance,
+                           out=distance)
+    return np.clip(coverage, 0, 1, out=coverage)
+
+
+def stripes(shape, thickness, spacing, angle):
+    """ Antialiased stripes at `angle`, 0 is horizontal, 90 vertical """
+    ny, nx = _stripe_phase(angle)
+    ys, xs = _axes(shape)
+    return _stripe_profile(ys * np.float32(ny) + xs * np.float32(nx),
+                           thickness, spacing + thickness)
+
+
+def load_tile(path, decode):
+    """ float32 gray tile decoded by decode(path), once per file version
+
+        Cached by (path, mtime), an edited tile gets decoded again.
+    """
+    def make():
+        tile = decode(path)
+        if tile is None:
+            raise OSError("can't decode tile {!r}".format(path))
+        return np.asarray(tile, dtype=np.float32)
+    return tiles.get((path, os.path.getmtime(path)), make)
+
+
+def _cells(image, cell):
+    """ (view of a part of `image` as (rows, h, cols, w) cells, the part
+        of `cell` it lines up with), for full cells and the cut off ones
+        at the right and bottom edges
+    """
+    h, w = image.shape
+    ch, cw = cell.shape
+    s0, s1 = image.strides
+    full_h, full_w = h - h % ch, w - w % cw
+    for top, bottom, rh in ((0, full_h, ch), (full_h, h, h - full_h)):
+        for left, right, rw in ((0, full_w, cw), (full_w, w, w - full_w)):
+            if bottom == top or right == left:
+                continue
+            region = image[top:bottom, left:right]
+            view = as_strided(region, ((bottom - top) // rh, rh,
+                                       (right - left) // rw, rw),
+                              (rh * s0, s0, rw * s1, s1))
+            yield view, cell[:rh, :rw][None, :, None, :]
+
+
+def blend_tiled(image, tile, spacing, opacity):
+    """ blend() `tile` repeated with `spacing` gaps into `image`, in place """
+    th, tw = tile.shape
+    values = np.zeros((th + spacing, tw + spacing), dtype=np.float32)
+    values[:th, :tw] = tile
+    coverage = np.zeros(values.shape, dtype=np.float32)
+    coverage[:th, :tw] = 1
+
+    for view, part in _cells(image, coverage):
+        rh, rw = part.shape[1], part.shape[3]
+        blend(view, part, opacity, values[:rh, :rw][None, :, None, :])
+    return image
+
+
+def texture(shape, seed=None):
+    """ Random gray levels, what the 'random' noise fills shapes with """
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, 256, shape, dtype=np.uint8).astype(np.float32)
+
+
+def blend(image, coverage, opacity, value=0):
+    """ Move `image` towards `value` by coverage * opacity, in place """
+    alpha = coverage * np.float32(opacity)
+    image -= (image - value) * alpha
+    return image
+
+
+def stripe_peaks(shape, thickness, spacing, angle):
+    """ Fourier series of stripes(), as (dys, dxs, coefficients)
+
+        Peaks are in bins from the spectrum center. They have to land on
+        bins, so the period and angle are nudged to the nearest ones
+        that tile the image exactly. Coefficients are the DFT of one
+        period of the stripes' profile, sampled at ceil(period) points
+        (at the pixels for a whole period), harmonics past Nyquist left
+        out.
+    """
+    h, w = shape
+    period = spacing + thickness
+    ny, nx = _stripe_phase(angle)
+    fy, fx = int(round(h * ny / period)), int(round(w * nx / period))
+
+    samples = max(1, int(np.ceil(period)))
+    position = np.arange(samples, dtype=np.float64) * (period / samples)
+    coefficients = np.fft.fft(_stripe_profile(position, thickness,
+                                              period)) / samples
+    if fy == fx == 0:
+        # stripes too coarse for this image, only their mean is left
+        return np.zeros(1, dtype=int), np.zeros(1, dtype=int), \
+            coefficients[:1].real
+    k = np.rint(np.fft.fftfreq(samples, 1 / samples)).astype(int)
+    if samples % 2 == 0:
+        # the profile's Nyquist term, -samples/2, gets a +samples/2 twin
+        k = np.append(k, samples // 2)
+        coefficients = np.append(coefficients, coefficients[samples // 2])
+    dys, dxs = k * fy, k * fx
+    # every peak on a bin of its own, none wrapping around
+    keep = ((-(h // 2) <= dys) & (dys < h - h // 2)
+            & (-(w // 2) <= dxs) & (dxs < w - w // 2))
+    if samples % 2 == 0 and keep[samples // 2] and keep[-1]:
+        # both twins fit, they share it and keep the image real
+        coefficients[samples // 2] /= 2
+        coefficients[-1] /= 2
+    return dys[keep], dxs[keep], coefficients[keep]
+
+
+def blend_spectrum(spectrum, peaks, opacity, value=0):
+    """ Centered spectrum of blend(image, stripes, ...) out of the
+        spectrum of `image` and stripe_peaks()
+
+        Multiplying by the pattern is a convolution with its few peaks,
+        so it's a handful of shifted copies of the spectrum.
+    """
+    h, w = spectrum.shape[-2:]
+    result = spectrum.copy()
+    for dy, dx, c in zip(*peaks):
+        shifted = np.roll(spectrum, (dy, dx), axis=(-2, -1))
+        result -= opacity * c * shifted
+        result[..., (h // 2 + dy) % h, (w // 2 + dx) % w] += (
+            opacity * c * value * h * w)
+    return result
@@ -0,0 +1,212 @@
+""" Filtering images too big for RAM, spectrum kept in numpy.memmap files
+
+    The 2D transform is done row-column: rfft along rows, one strip of
+    rows at a time, then fft along columns. Columns of a row-major file
+    are scattered over all of it, so the half spectrum is kept
+    transposed, column-major, and the rows' result gets there through a
+    transpose in square blocks. That way every pass reads and writes
+    each file about once, in runs of whole pages. Filters and the
+    inverse go the same way back. No more than `budget` bytes of strips
+    or blocks are in RAM at once, the rest lives on disk.
+
+    Filters are recipe filter ops (see spectral.recipe), evaluated on
+    the squared radii of each strip's bins instead of on a full mask.
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from spectral import fft
+from spectral.document import spatial_to_image
+from spectral.preview import preview_factor, PREVIEW_SIZE
+from spectral.recipe import filter_gain, filter_mask
+
+RAM_BUDGET = 512 * 2**20
+# images bigger than this only get to the GUI as a preview
+LARGE_IMAGE_PIXELS = 64 * 2**20
+# temporaries a strip goes through (read copy, transform output, cast)
+STRIP_COPIES = 3
+
+
+def image_shape(path):
+    """ (h, w) of the image at `path`, pixels are not read """
+    if path.lower().endswith('.npy'):
+        return np.load(path, mmap_mode='r').shape[-2:]
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = None
+    w, h = Image.open(path).size
+    return h, w
+
+
+def is_large(path):
+    h, w = image_shape(path)
+    return h * w > LARGE_IMAGE_PIXELS
+
+
+def open_source(path, budget=RAM_BUDGET, directory=None):
+    """ 2D float array of the image at `path`, in RAM only if it fits
+        in `budget` bytes as float32
+
+        Bigger .npy files are mapped as they are. Anything else is
+        decoded by Pillow (which still holds it at 1 byte per pixel for
+        8 bit images) and copied to a float32 scratch file strip by strip.
+    """
+    budget = budget or RAM_BUDGET
+    fits = np.prod(image_shape(path)) * 4 <= budget
+    if path.lower().endswith('.npy'):
+        if fits:
+            return np.load(path).astype(np.float32, copy=False)
+        return np.load(path, mmap_mode='r')
+
+    from PIL import Image
+    from spectral.imagefile import HIGH_MODES, image_scale
+
+    Image.MAX_IMAGE_PIXELS = None
+    image = Image.open(path)
+    if image.mode not in HIGH_MODES:
+        image = image.convert('L')
+    w, h = image.size
+    scale = image_scale(image)
+    if fits:
+        return np.asarray(image, dtype=np.float32) / scale
+    source = _scratch(directory, np.float32, (h, w))
+    rows = max(1, budget // (STRIP_COPIES * 4 * w))
+    for top in range(0, h, rows):
+        strip = image.crop((0, top, w, min(h, top + rows)))
+        source[top:top + rows] = np.asarray(strip, dtype=np.float32) / scale
+    source.flush()
+    return source
+
+
+def _scratch(directory, dtype, shape):
+    """ memmap backed by a temporary file, removed once unreferenced """
+    with tempfile.NamedTemporaryFile(dir=directory, prefix='fourierism-',
+                                     suffix='.raw', delete=False) as file:
+        path = file.name
+    array = np.memmap(path, dtype=dtype, mode='w+', shape=shape)
+    # the mapping keeps the data, the name can go right away on POSIX
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+    return array
+
+
+def transpose(src, dst, budget=RAM_BUDGET):
+    """ dst[...] = src.T for (memmapped) 2D arrays, in square blocks
+        small enough for `budget`, large enough to read whole pages
+    """
+    a, b = src.shape
+    block = max(1, int(np.sqrt(budget / (STRIP_COPIES * src.itemsize))))
+    for top in range(0, a, block):
+        for left in range(0, b, block):
+            dst[left:left + block, top:top + block] = (
+                src[top:top + block, left:left + block].T)
+    return dst
+
+
+def _centered(k, n):
+    """ Distance from the center of unshifted bin index `k` """
+    return (k + n // 2) % n - n // 2
+
+
+class OutOfCoreSpectrum:
+    """ Half spectrum of a big real image, on disk
+
+        Same results as SpectralDocument(half=True) running filter ops,
+        just never all in memory. self.spectrum is the (w // 2 + 1, h)
+        transpose of the rfft2 half spectrum.
+    """
+
+    def __init__(self, source, budget=RAM_BUDGET, directory=None):
+        self.source = source
+        self.shape = tuple(source.shape)
+        self.budget = budget
+        self.directory = directory
+        h, w = self.shape
+        self.spectrum = _scratch(directory, fft.complex_dtype(),
+                                 (w // 2 + 1, h))
+        self.forward()
+
+    def _strip(self, length, itemsize):
+        """ How many rows (or columns) of `length` bins fit the budget """
+        return max(1, self.budget // (STRIP_COPIES * length * itemsize))
+
+    def _rows(self, length, itemsize):
+        h = self.shape[0]
+        step = self._strip(length, itemsize)
+        for top in range(0, h, step):
+            yield slice(top, min(h, top + step))
+
+    def _columns(self):
+        """ Strips of spectrum columns, rows of the transposed file """
+        hw, h = self.spectrum.shape
+        step = self._strip(h, self.spectrum.itemsize)
+        for left in range(0, hw, step):
+            yield slice(left, min(hw, left + step))
+
+    def forward(self):
+        spectrum = self.spectrum
+        h, w = self.shape
+        work = _scratch(self.directory, spectrum.dtype, (h, w // 2 + 1))
+        for rows in self._rows(w, spectrum.itemsize):
+            work[rows] = fft.rfft(self.source[rows], axis=1)
+        transpose(work, spectrum, self.budget)
+        del work
+        for cols in self._columns():
+            spectrum[cols] = fft.fft(spectrum[cols], axis=1)
+        spectrum.flush()
+
+    def _circle(self, cols):
+        """ Squared distances from the center of bins in columns `cols` """
+        h, w = self.shape
+        dy = _centered(np.arange(h), h)[:, None]
+        dx = _centered(np.arange(cols.start, cols.stop), w)[None, :]
+        return dy**2 + dx**2
+
+    def filter_strip(self, strip, cols, ops):
+        """ Apply filter ops to spectrum columns `cols`, in place """
+        circle = self._circle(cols)
+        for op in ops:
+            if op['op'] != 'filter':
+                raise ValueError("only filters work out of core, "
+                                 "not {!r}".format(op['op']))
+            if op['profile'] == 'hard':
+                strip[filter_mask(op, self.shape, circle)] = 1
+            else:
+                strip *= filter_gain(op, self.shape, circle)
+        return strip
+
+    def render(self, ops=(), out=None):
+        """ Filtered image, float32 like SpectralDocument.render
+
+            `out` is where it goes, a float32 memmap (or array) of the
+            source shape, a scratch one when None. The spectrum itself
+            stays as it is, so this can go again with other ops.
+        """
+        h, w = self.shape
+        if out is None:
+            out = _scratch(self.directory, np.float32, self.shape)
+        columns = _scratch(self.directory, self.spectrum.dtype,
+                           self.spectrum.shape)
+        for cols in self._columns():
+            strip = self.filter_strip(np.array(self.spectrum[cols]).T,
+                                      cols, ops)
+            columns[cols] = fft.ifft(strip, axis=0).T
+        work = transpose(columns, _scratch(self.directory, columns.dtype,
+                                           columns.shape[::-1]), self.budget)
+        del columns
+        for rows in self._rows(work.shape[1], work.itemsize):
+            out[rows] = spatial_to_image(fft.irfft(work[rows], w, axis=1))
+        del work
+        if isinstance(out, np.memmap):
+            out.flush()
+        return out
+
+    @staticmethod
+    def preview(image, size=PREVIEW_SIZE):
+        """ Decimated copy of a (memmapped) image, small enough to show """
+        factor = preview_factor(image.shape, size)
+        return np.array(image[::factor, ::factor])
@@ -0,0 +1,56 @@
+""" Cheap low resolution previews of spectrum edits """
+import math
+
+import numpy as np
+
+PREVIEW_SIZE = 512
+
+
+def preview_factor(shape, size=PREVIEW_SIZE):
+    """ Decimation factor that brings `shape` down to about `size` """
+    return max(1, math.ceil(max(shape) / size))
+
+
+def _fold_axis(array, m, axis):
+    """ Sum the bins of a centered axis into m bins by frequency mod m """
+    n = array.shape[axis]
+    array = np.moveaxis(array, axis, 0)
+    out = np.zeros((m,) + array.shape[1:], dtype=array.dtype)
+    s = 0
+    while s < n:
+        # centered index s holds frequency s - n // 2
+        j = (s - n // 2) % m
+        count = min(m - j, n - s)
+        out[j:j + count] += array[s:s + count]
+        s += count
+    return np.moveaxis(out, 0, axis)
+
+
+def fold(spectrum, factor):
+    """ Uncentered spectrum of the image decimated by `factor`, out of
+        its centered full spectrum
+
+        Decimating in space sums up aliases in frequency, so every bin
+        of the full spectrum (and every brush stroke on it) ends up in
+        the preview, just folded. With sides divisible by `factor` this
+        is the spectrum of x[::f, ::f]. Otherwise the preview has
+        ceil(side / f) samples per side, taken at steps of side / samples
+        out of the trigonometric interpolation of the image, so it's
+        the image shrunk a bit off the exact factor, not x[::f, ::f].
+    """
+    h, w = spectrum.shape
+    m, n = -(-h // factor), -(-w // factor)
+    folded = _fold_axis(_fold_axis(spectrum, m, 0), n, 1)
+    folded *= m * n / (h * w)
+    return folded
+
+
+def fold_delta(folded, shape, ys, xs, delta):
+    """ Add changes at bins (ys, xs) of the centered full spectrum of
+        `shape` into `folded`
+    """
+    h, w = shape
+    m, n = folded.shape
+    np.add.at(folded, ((ys - h // 2) % m, (xs - w // 2) % n),
+              delta * (m * n / (h * w)))
+    return folded
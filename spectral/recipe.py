@@ -0,0 +1,249 @@
+""" Edit sessions as replayable recipes
+
+    A recipe is a list of plain dict ops, stored as JSON:
+
+    {"op": "filter", "name": "low", "radii": [30], "profile": "hard"}
+    {"op": "stroke", "points": [[x, y], ...], "shape": [h, w],
+     "brush": "square", "size": 20, "level": 0.5,
+     "x_sym": false, "y_sym": false, "opp_sym": false}
+    {"op": "stripes", "thickness": 2, "spacing": 8, "angle": 30,
+     "opacity": 0.5, "value": 0}
+    {"op": "resize", "factor": 2.0, "window": "hann"}
+    {"op": "restore"}
+
+    Filter radii are % of the larger spectrum side, stroke level is a
+    fraction of the brightest bin (in log2), strokes get scaled when
+    replayed on a spectrum of another shape. That's what makes a recipe
+    tuned on one frame usable on any other.
+
+    Stripes are the noise dialog's, in pixels and degrees, blended in
+    straight on the spectrum (spectral.noise.blend_spectrum).
+
+    Resize factors under 1 shrink the image, "window" is optional, one
+    of spectral.resample.WINDOWS. The new size is round(factor * side),
+    unless "smooth": true moves it on to a length fast to transform.
+
+    Filters and strokes on color images may have a "channel": n key,
+    without it they go to every channel.
+"""
+import json
+
+import numpy as np
+
+from spectral import fft
+from spectral.brush import rasterize
+from spectral.kernels import pass_filter, band_filter, response
+from spectral.masks import circle_mask, ring_mask, radius2
+
+# name: (number of radii, mask(squared radii, *radii),
+#        kernel spec(profile, *radii))
+FILTERS = {
+    'low': (1, lambda c, r: circle_mask(c, r, low=True),
+            lambda p, r: pass_filter(p, r, low=True)),
+    'high': (1, lambda c, r: circle_mask(c, r),
+             lambda p, r: pass_filter(p, r, low=False)),
+    'band': (2, lambda c, r1, r2: ring_mask(c, r1, r2),
+             lambda p, r1, r2: band_filter(p, r1, r2, False)),
+    'bandstop': (2, lambda c, r1, r2: ring_mask(c, r1, r2, True),
+                 lambda p, r1, r2: band_filter(p, r1, r2, True)),
+}
+
+
+def _with_channel(op, channel):
+    if channel is not None:
+        op['channel'] = channel
+    return op
+
+
+def filter_op(name, radii, profile='hard', channel=None):
+    return _with_channel({'op': 'filter', 'name': name, 'radii': list(radii),
+                          'profile': profile}, channel)
+
+
+def stroke_op(points, shape, brush, size, level,
+              x_sym=False, y_sym=False, opp_sym=False, channel=None):
+    return _with_channel({'op': 'stroke', 'points': [list(p) for p in points],
+                          'shape': list(shape), 'brush': brush, 'size': size,
+                          'level': level, 'x_sym': x_sym, 'y_sym': y_sym,
+                          'opp_sym': opp_sym}, channel)
+
+
+def stripes_op(thickness, spacing, angle, opacity, value=0, channel=None):
+    return _with_channel({'op': 'stripes', 'thickness': thickness,
+                          'spacing': spacing, 'angle': angle,
+                          'opacity': opacity, 'value': value}, channel)
+
+
+def resize_op(factor, window=None, smooth=False):
+    op = {'op': 'resize', 'factor': factor}
+    if window is not None:
+        op['window'] = window
+    if smooth:
+        op['smooth'] = True
+    return op
+
+
+def restore_op():
+    return {'op': 'restore'}
+
+
+def _radii(op, shape):
+    max_dim = max(shape)
+    return [max_dim * r / 100 for r in op['radii']]
+
+
+def filter_mask(op, shape, circle=None):
+    """ Bool mask of a hard filter op
+
+        On the whole centered spectrum of `shape`, or on squared radii
+        `circle` of just some of its bins.
+    """
+    h, w = shape
+    if circle is None:
+        circle = radius2(w, h)
+    return FILTERS[op['name']][1](circle, *_radii(op, shape))
+
+
+def filter_spec(op, shape):
+    """ spectral.kernels spec of a smooth filter op """
+    return FILTERS[op['name']][2](op['profile'], *_radii(op, shape))
+
+
+def filter_gain(op, shape, circle):
+    """ Kernel values of a smooth filter op at squared radii `circle` """
+    return response(filter_spec(op, shape), circle.astype(np.float32))
+
+
+def stroke_bins(op, shape, scale_factor):
+    """ (ys, xs, values) a stroke op writes into a spectrum of `shape` """
+    h, w = shape
+    sy, sx = h / op['shape'][0], w / op['shape'][1]
+    points = np.round(np.array(op['points'], dtype=float).reshape(-1, 2)
+                      * (sx, sy))
+    size = max(1, int(round(op['size'] * min(sx, sy))))
+
+    mask = rasterize(points, shape, op['brush'], size, x_sym=op['x_sym'],
+                     y_sym=op['y_sym'], opp_sym=op['opp_sym'])
+    ys, xs = np.nonzero(mask)
+    value = np.abs(2**(op['level'] * scale_factor))
+    return ys, xs, np.full(len(ys), value, dtype=fft.real_dtype())
+
+
+def _channel(document, op):
+    """ op's channel, checked against the channels `document` has """
+    channel = op.get('channel')
+    if channel is None:
+        return None
+    channels = document.channels
+    if channels is None or not 0 <= channel < channels:
+        raise ValueError("{} op for channel {}, the image {}".format(
+            op['op'], channel, "has {} channels".format(channels)
+            if channels else "is gray"))
+    return channel
+
+
+def apply_op(document, op):
+    """ Run a single op on a SpectralDocument """
+    kind = op['op']
+    channel = _channel(document, op)
+    if kind == 'filter':
+        if op['profile'] == 'hard':
+            document.apply_mask(filter_mask(op, document.shape),
+                                channel=channel)
+        else:
+            document.apply_filters([filter_spec(op, document.shape)],
+                                   channel)
+    elif kind == 'stroke':
+        document.paint(*stroke_bins(op, document.shape,
+                                    document.scale_factor), channel=channel)
+    elif kind == 'stripes':
+        document.add_stripes(op['thickness'], op['spacing'], op['angle'],
+                             op['opacity'], op.get('value', 0), channel)
+    elif kind == 'resize':
+        document.resize(op['factor'], op.get('window'),
+                        op.get('smooth', False))
+    elif kind == 'restore':
+        document.restore()
+    else:
+        raise ValueError("unknown recipe op {!r}".format(kind))
+
+
+def _fusable(op):
+    return op['op'] == 'filter'
+
+
+def _hard(op):
+    return op['profile'] == 'hard'
+
+
+def _fuses_with(op, first):
+    return (_fusable(op) and _hard(op) == _hard(first)
+            and op.get('channel') == first.get('channel'))
+
+
+class Recipe:
+
+    def __init__(self, ops=()):
+        self.ops = list(ops)
+
+    def __len__(self):
+        return len(self.ops)
+
+    def __iter__(self):
+        return iter(self.ops)
+
+    def append(self, op):
+        self.ops.append(op)
+
+    def extend(self, ops):
+        self.ops.extend(ops)
+
+    def dumps(self):
+        return json.dumps({'version': 1, 'ops': self.ops})
+
+    @classmethod
+    def loads(cls, text):
+        return cls(json.loads(text)['ops'])
+
+    def save(self, path):
+        with open(path, 'w') as file:
+            file.write(self.dumps())
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.loads(file.read())
+
+    def apply(self, document):
+        """ Replay on `document`, runs of filters fused
+
+            Consecutive hard filters become one OR-ed mask written once,
+            consecutive smooth ones one composite kernel multiply,
+            as long as they go to the same channel.
+        """
+        run = []
+        for op in self.ops:
+            if run and not _fuses_with(op, run[0]):
+                self._apply_filters(document, run)
+                run = []
+            if _fusable(op):
+                run.append(op)
+            else:
+                apply_op(document, op)
+        if run:
+            self._apply_filters(document, run)
+
+    @staticmethod
+    def _apply_filters(document, ops):
+        shape = document.shape
+        channel = _channel(document, ops[0])
+        if len(ops) == 1:
+            apply_op(document, ops[0])
+        elif _hard(ops[0]):
+            mask = filter_mask(ops[0], shape)
+            for op in ops[1:]:
+                mask |= filter_mask(op, shape)
+            document.apply_mask(mask, channel=channel)
+        else:
+            document.apply_filters([filter_spec(op, shape) for op in ops],
+                                   channel)
@@ -0,0 +1,146 @@
+""" Changing image size by changing its spectrum size
+
+    A centered spectrum gets cropped (smaller image) or padded with zeros
+    (bigger one) around its center, in both directions and per axis.
+    Even lengths have an unpaired Nyquist bin at index 0: padding splits
+    it half and half between -n/2 and +n/2, cropping to an even length
+    folds +p/2 into the new -p/2, so a real image stays real. Bins are
+    scaled by the size ratio, brightness stays the same.
+
+    An apodization window over the kept band softens the ringing a hard
+    crop of a sharp image gives. The new size is the requested one,
+    round(factor * side); with smooth=True it's moved to the nearest
+    5-smooth length on the far side of that, which the inverse FFT
+    afterwards handles fast.
+"""
+import numpy as np
+
+TUKEY_ALPHA = 0.5
+
+
+def _tukey(u):
+    taper = np.abs(u) > 1 - TUKEY_ALPHA
+    edge = (np.abs(u) - 1 + TUKEY_ALPHA) / TUKEY_ALPHA
+    return np.where(taper, 0.5 * (1 + np.cos(np.pi * edge)), 1.0)
+
+
+# window: gain at u, the frequency in units of the kept band's edge
+WINDOWS = {
+    'hann': lambda u: 0.5 * (1 + np.cos(np.pi * u)),
+    'hamming': lambda u: 0.54 + 0.46 * np.cos(np.pi * u),
+    'tukey': _tukey,
+}
+
+
+def smooth_size(n, down=False):
+    """ Smallest length >= n with no prime factors but 2, 3 and 5,
+        or the biggest one <= n if `down`
+    """
+    lengths = []
+    power5 = 1
+    while power5 <= 2 * n:
+        power35 = power5
+        while power35 <= 2 * n:
+            size = power35
+            while size <= 2 * n:
+                lengths.append(size)
+                size *= 2
+            power35 *= 3
+        power5 *= 5
+    if down:
+        return max(size for size in lengths if size <= max(n, 1))
+    return min(size for size in lengths if size >= n)
+
+
+def new_shape(shape, factor, smooth=False):
+    """ Plane shape `factor` times `shape`
+
+        With `smooth` each side that changes goes on to the nearest
+        5-smooth length in the same direction, a shrink stays a shrink.
+    """
+    sizes = [max(1, int(round(factor * n))) for n in shape]
+    if smooth:
+        sizes = [n if p == n else smooth_size(p, down=p < n)
+                 for n, p in zip(shape, sizes)]
+    return tuple(sizes)
+
+
+def _taps(n, p):
+    """ [(source slice, target slice, weight)] taking a centered axis of
+        n bins to p bins, Nyquist bins taken care of
+    """
+    cn, cp = n // 2, p // 2
+    if p == n:
+        return [(slice(0, n), slice(0, n), 1.0)]
+    if p > n:
+        offset = cp - cn
+        if n % 2:
+            return [(slice(0, n), slice(offset, offset + n), 1.0)]
+        # unpaired -n/2 goes half to -n/2, half to +n/2
+        return [(slice(1, n), slice(offset + 1, offset + n), 1.0),
+                (slice(0, 1), slice(offset, offset + 1), 0.5),
+                (slice(0, 1), slice(offset + n, offset + n + 1), 0.5)]
+    start = cn - cp
+    taps = [(slice(start, start + p), slice(0, p), 1.0)]
+    if p % 2 == 0:
+        # +p/2 has no place of its own any more, it joins -p/2
+        taps.append((slice(cn + cp, cn + cp + 1), slice(0, 1), 1.0))
+    return taps
+
+
+def _window(name, n, p):
+    """ Window over the p target bins of an axis, band edge at the
+        smaller of the two lengths
+    """
+    edge = min(n, p) / 2
+    u = (np.arange(p) - p // 2) / edge
+    return WINDOWS[name](np.clip(u, -1, 1))
+
+
+def fit(x, shape, window=None, scale=1.0, out=None):
+    """ Crop or pad the last two axes of centered spectrum `x` to `shape`
+
+        Every bin gets multiplied by `scale` on the way, and by
+        `window` (a WINDOWS name) if given. `out` is where to write,
+        a new array of x's dtype if None.
+    """
+    m, n = x.shape[-2:]
+    p, q = shape
+    if out is None:
+        out = np.zeros(x.shape[:-2] + (p, q), dtype=x.dtype)
+    elif p > m or q > n:
+        out.fill(0)
+
+    row_taps, col_taps = _taps(m, p), _taps(n, q)
+    if window is not None:
+        rows, cols = _window(window, m, p), _window(window, n, q)
+    # the first pair covers the most, assigned; the rest are additions
+    first = True
+    for sy, dy, wy in row_taps:
+        for sx, dx, wx in col_taps:
+            weight = scale * wy * wx
+            if window is not None:
+                weight = weight * np.outer(rows[dy], cols[dx])
+            target = out[..., dy, dx]
+            if first:
+                np.multiply(x[..., sy, sx], weight, out=target,
+                            casting='unsafe')
+                first = False
+            else:
+                target += x[..., sy, sx] * weight
+    return out
+
+
+def zeropad(x, shape):
+    """ x padded (or cropped) to `shape`, bins as they are """
+    return fit(x, shape)
+
+
+def resize(array, factor, window=None, smooth=False, out=None):
+    """ Scale centered spectrum `array` by `factor`, see fit() """
+    plane = array.shape[-2:]
+    shape = new_shape(plane, factor, smooth)
+    if shape == plane and window is None:
+        return array
+    scale = shape[0] * shape[1] / (plane[0] * plane[1])
+    return fit(array, shape, window, scale, out)
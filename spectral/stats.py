@@ -0,0 +1,110 @@
+""" Spectral statistics: radial and azimuthal power profiles, band energy
+
+    Every bin gets an integer radius (and angle) index once per spectrum
+    shape, cached next to the mask grids, so a profile is one bincount
+    with |F|**2 as weights. Radii here are in bins from the center, the
+    same ones round_mask takes, profile_radii() turns them into the %
+    of the larger side that the filter dialogs and recipes use.
+"""
+import numpy as np
+
+from spectral.masks import grids, radius2
+
+ANGLES = 36  # azimuthal bins over 0..180 degrees
+
+
+def radius_index(w, h):
+    """ Integer distance of every bin from the center, cached """
+    def make():
+        return np.rint(np.sqrt(radius2(w, h))).astype(np.int32)
+    return grids.get(('radius', w, h), make)
+
+
+def radius_counts(w, h):
+    """ How many bins each integer radius has """
+    return grids.get(('radius counts', w, h),
+                     lambda: np.bincount(radius_index(w, h).ravel()))
+
+
+def angle_index(w, h, angles=ANGLES):
+    """ Azimuth bin of every bin, 0..180 degrees (the power spectrum of
+        a real image is point symmetric), counter clockwise from +x
+    """
+    def make():
+        y, x = np.ogrid[-(h // 2):h - h // 2, -(w // 2):w - w // 2]
+        theta = np.arctan2(-y, x) % np.pi
+        index = (theta * (angles / np.pi)).astype(np.int32)
+        return np.minimum(index, angles - 1)
+    return grids.get(('angle', w, h, angles), make)
+
+
+def power(spectrum):
+    """ |F|**2 of a centered spectrum, channels summed up """
+    power = np.abs(np.asarray(spectrum))**2
+    return power.reshape((-1,) + power.shape[-2:]).sum(axis=0)
+
+
+def profile_radii(shape, count):
+    """ Radii 0..count-1 in % of the larger side, like filter radii """
+    return np.arange(count) * 100 / max(shape)
+
+
+def radial_profile(power):
+    """ Mean power at each integer radius """
+    h, w = power.shape
+    sums = np.bincount(radius_index(w, h).ravel(), weights=power.ravel())
+    return sums / radius_counts(w, h)
+
+
+def azimuthal_profile(power, angles=ANGLES, min_radius=1):
+    """ Mean power per direction, bins closer than `min_radius` left out,
+        DC has no direction
+    """
+    h, w = power.shape
+    index = angle_index(w, h, angles).ravel()
+    weights = power.ravel() * (radius_index(w, h).ravel() >= min_radius)
+    sums = np.bincount(index, weights=weights, minlength=angles)
+    counts = np.bincount(index, minlength=angles)
+    return sums / np.maximum(counts, 1)
+
+
+def band_energy(power, edges):
+    """ Fraction of all energy between consecutive `edges` (bin radii),
+        inner edge included, outer one not
+    """
+    h, w = power.shape
+    sums = np.bincount(radius_index(w, h).ravel(), weights=power.ravel())
+    cumulative = np.concatenate(([0], np.cumsum(sums)))
+    edges = np.clip(np.ceil(edges).astype(int), 0, len(sums))
+    return np.diff(cumulative[edges]) / max(cumulative[-1], 1e-300)
+
+
+def anisotropy(azimuthal):
+    """ (strength 0..1, direction in degrees) of an azimuthal profile
+
+        The second circular moment: 0 for power spread evenly over
+        all directions, 1 for all of it along one.
+    """
+    angles = len(azimuthal)
+    theta = (np.arange(angles) + 0.5) * np.pi / angles
+    moment = np.sum(azimuthal * np.exp(2j * theta))
+    total = np.sum(azimuthal)
+    if not total:
+        return 0.0, 0.0
+    return abs(moment) / total, np.degrees(np.angle(moment) / 2) % 180
+
+
+class SpectralStats:
+    """ Everything above for one spectrum, |F|**2 computed once """
+
+    def __init__(self, spectrum, bands=(0, 5, 10, 25, 50, 100)):
+        self.power = power(spectrum)
+        h, w = self.shape = self.power.shape
+        self.radial = radial_profile(self.power)
+        self.radii = profile_radii(self.shape, len(self.radial))
+        self.azimuthal = azimuthal_profile(self.power)
+        self.anisotropy = anisotropy(self.azimuthal)
+        # bands in % of the larger side, as the filter dialogs have them
+        self.bands = list(bands)
+        self.band_energy = band_energy(
+            self.power, np.array(bands) * max(h, w) / 100)
@@ -2,17 +2,26 @@ from itertools import product
 
 from PySide.QtGui import (QWidget, QPixmap, QPainter, QImage, QCursor,
                           QColor, QGraphicsOpacityEffect)
-from PySide.QtCore import Qt, Signal, Slot, QRect
+from PySide.QtCore import Qt, Signal, Slot, QRect, QTimer
 from PySide.QtSvg import QSvgRenderer
 import numpy as np
 
 
 from ui.widgets.color_widget import ColorWidget
-from utils import (array_to_image, image_to_array, rescale_array,
-                   array_to_fft, fft_to_array, zeropad)
+from ui.widgets.worker import Worker
+from spectral.fft import ifft2
+from spectral.half import HalfSpectrum
+from spectral.preview import fold, fold_delta, preview_factor
+from spectral.recipe import stroke_op, stroke_bins, resize_op, restore_op
+from spectral.dirty import DirtyRegion
+from spectral.display import LogMagnitude
+from spectral.document import SpectralDocument
+from utils import rgb32_image, spatial_to_array
 
 #magic_wand = QSvgRenderer(":cursors/magic_wand.svg")
 
+PREVIEW_FPS = 10
+
 class Overlay(QWidget):
     mask = None
 
@@ -53,45 +62,111 @@ class Fourier(QWidget):
     """ Actual fourier display and drawing widget """
 
     fourier_updated = Signal(np.ndarray)
+    fourier_preview = Signal(np.ndarray)
     image = None
     pressed = False
-    scale_factor = None
     color = QColor(0, 0, 0)
-    raw_fourier = None
     x_sym = False
     y_sym = False
     opp_sym = False
+    half_spectrum = False  # keep rfft2 half only, see spectral.half
+    live_preview = True
+    preview_base = None
     # signal fourier updated
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.update_cursor('square', 20)
         self.overlay = Overlay(self)
+        # Spectrum and edits live in the document, this just shows it
+        self.document = SpectralDocument(half=self.half_spectrum)
+        self.document.observe(self.on_document)
+        self.inverse_valid = False
+        self.flush = False
+        self.dirty = DirtyRegion()
+        self.display = LogMagnitude()
+
+        # Transforms run off the GUI thread, only the newest result is used
+        self.forward_worker = Worker(self._forward)
+        self.forward_worker.finished.connect(self._on_forward)
+        self.inverse_worker = Worker(self.document.render,
+                                     merge=self._merge_changes)
+        self.inverse_worker.finished.connect(self.fourier_updated.emit)
+
+        # Low resolution image while dragging, the real one comes on release
+        self.preview_worker = Worker(self._preview)
+        self.preview_worker.finished.connect(self.fourier_preview.emit)
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setInterval(1000 // PREVIEW_FPS)
+        self.preview_timer.timeout.connect(self.update_preview)
 
     def update_image(self, fft_array, factor=None):
-
-        scaled_values, sf = rescale_array(np.real(np.log2(fft_array)),
-                                          self.scale_factor)
-        self.scale_factor = sf
-        self.image = array_to_image(scaled_values)
-        self.setMinimumSize(self.image.size())
-        self.overlay.resize(self.image.size())
-        self.update()
-        self.updateGeometry()
-        # I have to deliver, and it's broken on windows.
-        self.setMinimumSize(self.image.size())
-        self.overlay.resize(self.image.size())
+        resized = self.image is None or self.pixels.shape != fft_array.shape
+        if resized:
+            # self.pixels is a view of self.image, both get drawn into
+            self.image, self.pixels = rgb32_image(fft_array.shape)
+
+        self.display.render(fft_array, self.pixels, self.scale_factor)
+        if resized:
+            self.setMinimumSize(self.image.size())
+            self.overlay.resize(self.image.size())
+            self.updateGeometry()
         self.update()
-        self.updateGeometry()
+        self.dirty.clear()
+
+    @property
+    def raw_fourier(self):
+        return self.document.spectrum
+
+    @property
+    def scale_factor(self):
+        return self.document.scale_factor
+
+    def mark_dirty(self, ys, xs):
+        shape = self.raw_fourier.shape
+        self.dirty.mark(ys, xs, shape)
+        if isinstance(self.raw_fourier, HalfSpectrum) and not self.dirty.full:
+            # conjugate bins changed along
+            self.dirty.mark(*self.raw_fourier.mirror(ys, xs), shape=shape)
+
+    def refresh_image(self):
+        """ Redraw only the dirty parts of self.image """
+        rects = self.dirty.rects(self.raw_fourier.shape)
+        if rects is None or self.image is None:
+            self.update_image(self.raw_fourier, self.scale_factor)
+            return
 
-    def update_fourier(self, image_array, flush=False):
-        f = array_to_fft(image_array)
-        if self.raw_fourier is None or flush:
-            self.original = f.copy()
+        for y0, y1, x0, x1 in rects:
+            region = (slice(y0, y1), slice(x0, x1))
+            self.display.render(self.raw_fourier, self.pixels,
+                                self.scale_factor, region)
+            self.update(QRect(x0, y0, x1 - x0, y1 - y0))
+        self.dirty.clear()
 
-        self.raw_fourier = f.copy()
+    def update_fourier(self, image_array, flush=False):
+        self.flush = self.flush or flush
+        self.forward_worker.submit(image_array)
+
+    def _forward(self, image_array):
+        return image_array, self.document.forward(image_array)
+
+    def _on_forward(self, result):
+        image_array, spectrum = result
+        flush, self.flush = self.flush, False
+        self.document.load(image_array, flush, spectrum)
+
+    def on_document(self, event, ys, xs, delta):
+        """ Keep the picture and the image window in sync with document """
+        if event == 'edit':
+            self.mark_dirty(ys, xs)
+            self.refresh_image()
+            self.emit_fourier(None if delta is None else (ys, xs, delta))
+            return
 
-        self.update_image(self.raw_fourier)
+        self.inverse_valid = False
+        self.update_image(self.raw_fourier, self.scale_factor)
+        if event != 'load':
+            self.emit_fourier()
 
     def update_cursor(self, shape, size):
         self.cursor_size = size
@@ -129,38 +204,72 @@ class Fourier(QWidget):
         self.color = QColor(color, color, color)
 
 
-    def emit_fourier(self):
-        array = fft_to_array(self.raw_fourier)
-        self.fourier_updated.emit(array)
+    def emit_fourier(self, changed=None):
+        """ changed: (ys, xs, delta) of the bins edited since last emit """
+        if not self.inverse_valid:
+            changed = None
+            self.inverse_valid = True
+        # worker gets a snapshot, painting goes on meanwhile
+        self.inverse_worker.submit(self.raw_fourier.copy(), changed)
+
+    @staticmethod
+    def _preview(folded):
+        return spatial_to_array(ifft2(folded))
+
+    def start_preview(self):
+        self.preview_factor = preview_factor(self.raw_fourier.shape)
+        self.preview_base = fold(np.asarray(self.raw_fourier),
+                                 self.preview_factor)
+        self.preview_dirty = True
+        self.preview_timer.start()
+
+    def stop_preview(self):
+        self.preview_timer.stop()
+        self.preview_worker.cancel()
+        self.preview_base = None
+
+    def update_preview(self):
+        if not self.preview_dirty:
+            return
+        self.preview_dirty = False
+
+        ys, xs, values = self._stroke()
+        delta = values - self.raw_fourier[ys, xs]
+        folded = fold_delta(self.preview_base.copy(),
+                            self.raw_fourier.shape[-2:], ys, xs, delta)
+        self.preview_worker.submit(folded)
+
+    @staticmethod
+    def _merge_changes(pending, new):
+        """ Deltas of a dropped job must not get lost, they add up """
+        spectrum, changed = new
+        if changed is None or pending[1] is None:
+            return spectrum, None
+        return spectrum, tuple(np.concatenate(pair, axis=-1)
+                               for pair in zip(pending[1], changed))
 
     def on_restore(self):
-        self.raw_fourier = self.original.copy()
-        self.update_image(self.raw_fourier, self.scale_factor)
-        #self.fourier_updated.emit(self.raw_fourier.copy())
-        self.emit_fourier()
+        self.document.run(restore_op())
 
-    def on_resize(self, factor):
-        if factor == 1.0: return
-        #even = lambda x: x if (x % 2 == 0) else x + 1
-        array = self.raw_fourier
+    def on_undo(self):
+        if self.raw_fourier is not None:
+            self.document.undo()
 
-        reshape = lambda x_y: [int(factor * x_y[0]), int(factor * x_y[1])]
-        diff = lambda x_y: [x_y[0] - array.shape[0], x_y[1] - array.shape[1]]
-        nexteven = lambda x: x if (x % 2 == 0) else x + 1
-        delta = map(nexteven, diff(reshape(array.shape)))
-        newsize = tuple(x[0] + x[1] for x in zip(array.shape, delta))
+    def on_redo(self):
+        if self.raw_fourier is not None:
+            self.document.redo()
 
-        self.raw_fourier = zeropad(array, newsize)
-        self.update_image(self.raw_fourier, self.scale_factor)
-        #self.fourier_updated.emit(self.raw_fourier.copy())
-        self.emit_fourier()
+    def on_resize(self, factor, window=None):
+        if factor != 1.0 or window is not None:
+            self.document.run(resize_op(factor, window))
 
-    def draw_mask_on_fourier(self, mask, value=0x00):
-        self.raw_fourier[mask] = 2**value
-        self.update_image(self.raw_fourier, self.scale_factor)
-        self.emit_fourier()
+    def apply_op(self, op):
+        """ Filter dialogs hand over recipe ops, see spectral.recipe """
+        self.document.run(op)
 
     def regen_image(self):
+        if self.raw_fourier is None:
+            return
         self.update_image(self.raw_fourier, self.scale_factor)
 
     def paintEvent(self, event):
@@ -174,28 +283,38 @@ class Fourier(QWidget):
         painter.drawImage(rect.topLeft(), self.image, rect)
 
     def mousePressEvent(self, event):
+        if self.image is None:
+            return
         self.pressed = True
-        self.draw_buffer = QPixmap(self.image.size())
-        color = self.color.red() ^ 0xAA
-        self.draw_buffer.fill(QColor(color, color, color))
+        self.stroke = []
         self.draw(event)
+        if self.live_preview:
+            self.start_preview()
 
     def mouseReleaseEvent(self, event):
+        if not self.pressed:
+            return
         self.pressed = False
         self.draw(event)
+        self.stop_preview()
         self.fourier_draw()
 
     def mouseMoveEvent(self, event):
         if self.pressed:
             self.draw(event)
 
-    def fourier_draw(self):
+    def _stroke_op(self):
+        return stroke_op(self.stroke, self.raw_fourier.shape, self.shape,
+                         self.cursor_size, self.color.red() / 255,
+                         self.x_sym, self.y_sym, self.opp_sym)
 
-        arr = image_to_array(self.draw_buffer.toImage())
+    def _stroke(self):
+        """ Bins under the current stroke and values they're getting """
+        return stroke_bins(self._stroke_op(), self.raw_fourier.shape,
+                           self.scale_factor)
 
-        values = arr[arr == self.color.red()] * (self.scale_factor/255)
-        self.raw_fourier[arr == self.color.red()] = np.abs(2**values)
-        self.emit_fourier()
+    def fourier_draw(self):
+        self.document.run(self._stroke_op())
 
     def _paint(self, painter, x, y):
         size = self.cursor_size
@@ -215,17 +334,21 @@ class Fourier(QWidget):
         x, y = event.x(), event.y()
         max_y, max_x = self.raw_fourier.shape
 
-        for painter in map(QPainter, [self.image, self.draw_buffer]):
-            self._paint(painter, x, y)
-            if self.x_sym:
-                self._paint(painter, abs(max_x - x - self.cursor_size), y)
-            if self.y_sym:
-                self._paint(painter, x, abs(max_y - y - self.cursor_size))
-            if (self.x_sym and self.y_sym) or self.opp_sym:
-                self._paint(painter, abs(max_x - x - self.cursor_size), abs(max_y - y - self.cursor_size))
-
-            del painter
+        self.stroke.append((x, y))
+
+        # Only what's shown gets painted here, spectrum gets the stroke
+        # rasterized by _stroke
+        painter = QPainter(self.image)
+        self._paint(painter, x, y)
+        if self.x_sym:
+            self._paint(painter, abs(max_x - x - self.cursor_size), y)
+        if self.y_sym:
+            self._paint(painter, x, abs(max_y - y - self.cursor_size))
+        if (self.x_sym and self.y_sym) or self.opp_sym:
+            self._paint(painter, abs(max_x - x - self.cursor_size), abs(max_y - y - self.cursor_size))
+        del painter
 
+        self.preview_dirty = True
         self.update()
 
     def sizeHint(self):
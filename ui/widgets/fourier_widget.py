@@ -3,7 +3,7 @@ from PySide.QtGui import (QMainWindow, QSlider,
                           QLabel, QSpinBox, QDialog,
                           QComboBox, QCheckBox, QFileDialog)
 
-from PySide.QtCore import Signal, Slot
+from PySide.QtCore import Signal, Slot, QTimer
 import numpy as np
 
 from ui.ui_fourier_window import Ui_FourierWindow
@@ -13,11 +13,15 @@ import ui.ui_fourier_resize as fr
 import ui.ui_fourier_band as bd
 
 from ui.widgets.color_widget import ColorWidget
+from ui.widgets.spectrum_stats import SpectrumStatsWidget
 from common import brush_shapes
+from spectral.masks import round_mask, band_mask
+from spectral.kernels import kernel, pass_filter, band_filter
+from spectral.recipe import filter_op
 
 
 class ResizeDialog(QDialog, fr.Ui_Dialog):
-    resized = Signal(float)
+    resized = Signal(float, object)
 
     def __init__(self, accept=None, reject=None, low=True, parent=None):
         QDialog.__init__(self, parent)
@@ -27,11 +31,34 @@ class ResizeDialog(QDialog, fr.Ui_Dialog):
         self.buttonBox.accepted.connect(self._resize)
 
     def _resize(self):
-        self.resized.emit(self.doubleSpinBox.value())
+        window = self.combo_window.currentText()
+        self.resized.emit(self.doubleSpinBox.value(),
+                          None if window == 'none' else window)
         self.close()
 
 
 class Dialog:
+    mask = None
+    mask_timer = None
+    COALESCE_MS = 30
+
+    def schedule_update(self, *args):
+        """ Sliders fire on every tick, only the last one in a burst counts """
+        if self.mask_timer is None:
+            self.mask_timer = QTimer(self)
+            self.mask_timer.setSingleShot(True)
+            self.mask_timer.setInterval(self.COALESCE_MS)
+            self.mask_timer.timeout.connect(self.update_mask)
+        self.mask_timer.start()
+
+    @property
+    def profile(self):
+        return self.combo_profile.currentText()
+
+    def _set_filter(self, spec):
+        """ Smooth filter chosen, overlay shows where it attenuates most """
+        self.mask = np.less(kernel(spec, self.width, self.height), 0.5,
+                            out=self.mask)
 
     def setFourierSize(self, size):
         self.height = size.height()
@@ -46,8 +73,12 @@ class Dialog:
         QDialog.closeEvent(self, event)
 
     def _apply_mask(self):
+        if self.mask_timer is not None and self.mask_timer.isActive():
+            self.mask_timer.stop()
+            self.update_mask()
+        # nothing generated yet, nothing to apply
         if self.mask is not None:
-            self.mask_accepted.emit(self.mask.copy())
+            self.op_accepted.emit(self.op)
         self._clear()
         self.close()
 
@@ -56,7 +87,7 @@ class Dialog:
 
 
 class BandpassDialog(Dialog, QDialog, bd.Ui_Dialog):
-    mask_accepted = Signal(np.ndarray)
+    op_accepted = Signal(object)
     updated = Signal(np.ndarray)
 
     def __init__(self, low=True, parent=None):
@@ -80,13 +111,21 @@ class BandpassDialog(Dialog, QDialog, bd.Ui_Dialog):
         self.slider_to.valueChanged.connect(bind1)
         self.slider_from.valueChanged.connect(bind2)
 
-        self.slider_to.valueChanged.connect(self.update_mask)
-        self.slider_from.valueChanged.connect(self.update_mask)
-        self.check_inverse.stateChanged.connect(self.update_mask)
+        self.slider_to.valueChanged.connect(self.schedule_update)
+        self.slider_from.valueChanged.connect(self.schedule_update)
+        self.check_inverse.stateChanged.connect(self.schedule_update)
+        self.combo_profile.currentIndexChanged.connect(self.schedule_update)
 
         self.buttonBox.rejected.connect(self._clear)
         self.buttonBox.accepted.connect(self._apply_mask)
 
+    @property
+    def op(self):
+        """ Recipe op of the current settings, see spectral.recipe """
+        name = 'bandstop' if self.check_inverse.isChecked() else 'band'
+        radii = [self.slider_from.value(), self.slider_to.value()]
+        return filter_op(name, radii, self.profile)
+
     @Slot()
     def update_mask(self):
         max_dim = max(self.height, self.width)
@@ -95,59 +134,52 @@ class BandpassDialog(Dialog, QDialog, bd.Ui_Dialog):
         diam1 = max_dim * (self.slider_from.value() / 100)
         diam2 = max_dim * (self.slider_to.value() / 100)
 
-        self.mask = self._gen_mask(diam1, diam2, inverse)
-        self.updated.emit(self.mask.copy())
-
-    def _gen_mask(self, diam1, diam2, inverse):
-        x = self.width // 2
-        y = self.height // 2
-
-        a, b = np.ogrid[-y:y, -x:x]
-
-        circle = a**2 + b**2
-
-        if inverse:
-            return np.logical_and(diam2**2 > circle, circle > diam1**2)
+        if self.profile == 'hard':
+            self.mask = band_mask(diam1, diam2, self.width, self.height,
+                                  inverse, out=self.mask)
         else:
-            return np.logical_or(diam1**2> circle,  diam2**2 < circle)
+            self._set_filter(band_filter(self.profile, diam1, diam2, inverse))
+        self.updated.emit(self.mask.copy())
 
 
 class PassFilterDialog(Dialog, QDialog, ff.Ui_Dialog):
-    mask_accepted = Signal(np.ndarray)
+    op_accepted = Signal(object)
     updated = Signal(np.ndarray)
-    mask = None
 
     def __init__(self, low=True, parent=None):
         QDialog.__init__(self, parent)
         self.setupUi(self)
         self.low = low
-        self.horizontalSlider.valueChanged.connect(self.update_mask)
+        self.horizontalSlider.valueChanged.connect(self.schedule_update)
+        self.combo_profile.currentIndexChanged.connect(self.schedule_update)
         self.buttonBox.rejected.connect(self._clear)
         self.buttonBox.accepted.connect(self._apply_mask)
 
-    def update_mask(self, diam):
+    @property
+    def op(self):
+        """ Recipe op of the current settings, see spectral.recipe """
+        diam = self.horizontalSlider.value()
+        diam = diam if not self.low else 99 - diam
+        return filter_op('low' if self.low else 'high', [diam], self.profile)
+
+    @Slot()
+    def update_mask(self):
+        diam = self.horizontalSlider.value()
         diam = diam if not self.low else 99 - diam
         print(diam)
         max_dim = max(self.height, self.width)
         diam = max_dim * (diam/100)
-        self.mask = round_mask(diam, self.width, self.height, low=self.low)
+        if self.profile == 'hard':
+            self.mask = round_mask(diam, self.width, self.height,
+                                   low=self.low, out=self.mask)
+        else:
+            self._set_filter(pass_filter(self.profile, diam, self.low))
         self.updated.emit(self.mask.copy())
 
 
-def round_mask(diameter, w, h, center=None, low=False):
-    if not center:
-        x = w // 2
-        y = h // 2
-
-    a, b = np.ogrid[-y:y, -x:x]
-    if low:
-        return a**2 + b**2 > diameter**2
-    else:
-        return a**2 + b**2 <= diameter**2
-
-
 class FourierWidget(QMainWindow, Ui_FourierWindow):
     fourier_updated = Signal(np.ndarray)
+    fourier_preview = Signal(np.ndarray)
 
     def __init__(self, parent_title):
         QMainWindow.__init__(self)
@@ -155,6 +187,10 @@ class FourierWidget(QMainWindow, Ui_FourierWindow):
         self.setup_toolbar()
         self.setWindowTitle("{}'s Fourier".format(parent_title))
         self.fourier.fourier_updated.connect(self.fourier_updated.emit)
+        self.fourier.fourier_preview.connect(self.fourier_preview.emit)
+
+        self.stats = SpectrumStatsWidget(parent_title)
+        self.fourier.fourier_updated.connect(self.update_stats)
 
         self.setup_actions()
         self.resize(800, 600)
@@ -163,19 +199,39 @@ class FourierWidget(QMainWindow, Ui_FourierWindow):
         self.action_low_pass.triggered.connect(self.on_action_low_pass)
         self.action_high_pass.triggered.connect(self.on_action_high_pass)
         self.action_band_pass.triggered.connect(self.on_action_band_pass)
+        self.action_spectrum_stats.triggered.connect(
+            self.on_action_spectrum_stats)
 
         self.action_resize.triggered.connect(self.on_action_resize)
         self.action_save_as.triggered.connect(self.on_action_save_as)
+        self.action_save_recipe.triggered.connect(self.on_action_save_recipe)
 
         self.action_restore.triggered.connect(self.fourier.on_restore)
+        self.action_undo.triggered.connect(self.fourier.on_undo)
+        self.action_redo.triggered.connect(self.fourier.on_redo)
         self.action_update.triggered.connect(self.fourier.regen_image)
 
+    def update_stats(self, *args):
+        if self.fourier.raw_fourier is not None:
+            self.stats.update_spectrum(self.fourier.raw_fourier)
+
+    def on_action_spectrum_stats(self):
+        self.update_stats()
+        self.stats.show()
+
     def on_action_save_as(self):
         path, _ = QFileDialog.getSaveFileName(self)
         if not path:
             return
         self.fourier.image.save(path)
 
+    def on_action_save_recipe(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Recipe",
+                                              filter="recipes (*.json)")
+        if not path:
+            return
+        self.fourier.document.recipe.save(path)
+
     def setup_toolbar(self):
         color_widget = ColorWidget()
         color_widget.color_changed.connect(self.fourier.on_color_change)
@@ -223,7 +279,7 @@ class FourierWidget(QMainWindow, Ui_FourierWindow):
         dialog = dialog_type(*args, **kwargs)
         dialog.setFourierSize(self.fourier.sizeHint())
         dialog.updated.connect(self.fourier.overlay.set)
-        dialog.mask_accepted.connect(self.fourier.draw_mask_on_fourier)
+        dialog.op_accepted.connect(self.fourier.apply_op)
         return dialog
 
     def on_action_band_pass(self):
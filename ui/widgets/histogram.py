@@ -2,6 +2,8 @@ import PySide
 import pyqtgraph as pg
 import numpy as np
 
+from spectral.document import spatial_to_array
+
 
 class Histogram(pg.PlotWidget):
     bp = None
@@ -19,10 +21,13 @@ class Histogram(pg.PlotWidget):
 
     def update(self, image_array):
         """:type image_array: numpy.ndarray """
-        h, w = image_array.shape
-        total = h * w
-        values = np.bincount(image_array.flat, minlength=256)/total
+        if image_array.dtype != np.uint8:
+            image_array = spatial_to_array(image_array)
+        self.set_counts(np.bincount(image_array.flat, minlength=256))
+
+    def set_counts(self, counts):
+        values = counts / max(1, counts.sum())
         self.values = values
         max_value = np.max(values)
-        self.bp.setOpts(x=np.arange(256), width=0.5, height=values)
+        self.bp.setOpts(height=values)
         self.setYRange(0, max_value)
@@ -1,6 +1,6 @@
 from PySide import QtGui
 from PySide.QtGui import QWidget
-from PySide.QtCore import Signal
+from PySide.QtCore import Signal, QTimer
 import numpy as np
 
 from ui.ui_histogram_window import Ui_HistogramWindow
@@ -8,12 +8,32 @@ from ui.ui_histogram_window import Ui_HistogramWindow
 
 class HistogramWidget(QWidget, Ui_HistogramWindow):
     fourier_updated = Signal(np.ndarray)
+    REDRAW_MS = 100
+    counts = None  # newest counts, not drawn yet
 
     def __init__(self, parent_title, parent=None):
         QWidget.__init__(self, parent)
         self.setupUi(self)
 
         self.setWindowTitle("{}'s Histogram".format(parent_title))
+        # edits come faster than a plot is worth redrawing
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.setInterval(self.REDRAW_MS)
+        self.redraw_timer.timeout.connect(self.redraw)
 
-    def update_histogram(self, image_array, cause):
-        self.histogram.update(image_array)
+    def update_counts(self, counts):
+        """ Gray level counts of the image, see spectral.histogram """
+        self.counts = counts
+        if self.isVisible() and not self.redraw_timer.isActive():
+            self.redraw_timer.start()
+
+    def redraw(self):
+        if self.counts is not None and self.isVisible():
+            self.histogram.set_counts(self.counts)
+            self.counts = None
+
+    def showEvent(self, event):
+        # hidden ones skip drawing, catch up with the last counts
+        self.redraw()
+        super().showEvent(event)
@@ -3,25 +3,30 @@ import os
 import numpy as np
 from PySide import QtGui
 from PySide.QtCore import Signal
-from PySide.QtGui import (QImage, QPixmap, QWidget, QMainWindow, QFileDialog,
-                          QPainter, QColor)
+from PySide.QtGui import QImage, QPixmap, QWidget, QMainWindow, QFileDialog
 
 from ui.ui_image_window import Ui_ImageWindow
+from spectral import imagefile, outofcore
+from spectral.histogram import DisplayHistogram
 from ui.widgets.noise_dialog import NoiseDialog
 from utils import array_to_image, image_to_array, fft_to_array, array_to_fft
 
 class ImageWidget(QMainWindow, Ui_ImageWindow):
     image_updated = Signal(np.ndarray, str)
+    counts_updated = Signal(np.ndarray)  # gray level counts on screen
 
     histogram = None
     fourier = None
-    image_array = None
+    image_array = None  # float32 working image, uint8 only on screen
     image_original = None
+    depth = 8  # bits per pixel of the file, kept when saving
 
     def __init__(self, parent=None):
         QMainWindow.__init__(self, parent)
         self.setupUi(self)
         self.setup_actions()
+        # display conversion and histogram counts in one pass
+        self.display = DisplayHistogram()
 
 
     def setup_actions(self):
@@ -36,25 +41,27 @@ class ImageWidget(QMainWindow, Ui_ImageWindow):
 
     def save_as(self):
         path, _ = QFileDialog.getSaveFileName(self, "Save As")
-        self.image_label.pixmap().save(path)
+        if not path:
+            return
+        try:
+            imagefile.write(path, self.image_array, self.depth)
+        except ImportError:  # no Pillow, Qt writes what's on screen
+            self.image_label.pixmap().save(path)
 
     def add_noise(self):
         dialog = NoiseDialog()
-        if not dialog.exec_():
+        if not dialog.exec_() or self.image_array is None:
             return
-        function = dialog.painter_function
-
-        image = self.image_label.pixmap().toImage()
-        painter = QPainter(image)
-        function(painter, QColor(0, 0, 0))
-        self.update(image_to_array(image))
-        del painter
+        image = self.image_array.copy()
+        dialog.noise_function(image)
+        self.update(image)
 
 
     def update(self, image_array, refresh=True, flush=False, cause='load'):
         if image_array is None:
             return
 
+        image_array = np.asarray(image_array, dtype=np.float32)
         if self.image_original is None or flush:
             self.image_original = image_array
 
@@ -62,12 +69,21 @@ class ImageWidget(QMainWindow, Ui_ImageWindow):
         self.image_updated.emit(image_array.copy(), cause)
 
         if refresh:
-            image = array_to_image(self.image_array)
+            image = array_to_image(self.display.update(self.image_array))
             self.image_label.setPixmap(QPixmap(image))
+            self.counts_updated.emit(self.display.counts)
 
     def from_fourier(self, fft_array):
         self.update(fft_array, cause='fourier')
 
+    def show_preview(self, preview_array):
+        """ Display a low resolution preview, image_array stays as it is """
+        if self.image_array is None:
+            return
+        h, w = self.image_array.shape
+        pixmap = QPixmap(array_to_image(preview_array))
+        self.image_label.setPixmap(pixmap.scaled(w, h))
+
     def setup_menu(self):
         self.menu = QtGui.QMenu()
         self.menu.addAction(QtGui.QAction("item", self))
@@ -80,8 +96,19 @@ class ImageWidget(QMainWindow, Ui_ImageWindow):
 
 
     def load_file(self, file_name):
-        array = image_to_array(QImage(file_name), to_gray=True)
+        title = os.path.basename(file_name)
+        try:
+            if outofcore.is_large(file_name):
+                # too big to edit here, `Fourierism batch --budget` does it
+                source = outofcore.open_source(file_name)
+                array = outofcore.OutOfCoreSpectrum.preview(source)
+                title += " (preview)"
+            else:
+                array, self.depth = imagefile.read(file_name)
+        except (ImportError, OSError):  # 8 bits is all Qt reads
+            array, self.depth = image_to_array(QImage(file_name),
+                                               to_gray=True), 8
         if array is None:
             return
         self.update(array.copy())
-        self.setWindowTitle(os.path.basename(file_name))
+        self.setWindowTitle(title)
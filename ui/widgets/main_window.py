@@ -75,8 +75,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         histogram = HistogramWidget(title)
 
         image.image_updated.connect(fourier.update_fourier)
-        image.image_updated.connect(histogram.update_histogram)
+        image.counts_updated.connect(histogram.update_counts)
         fourier.fourier_updated.connect(image.from_fourier)
+        fourier.fourier_preview.connect(image.show_preview)
         image.load_file(file_path)
 
         flags= Qt.CustomizeWindowHint |Qt.WindowTitleHint | Qt.WindowMinMaxButtonsHint
@@ -1,14 +1,12 @@
-from itertools import product, zip_longest
-import math
-
 from PySide.QtGui import (QDialog, QWidget, QFileDialog, QImage,
-                          QDialogButtonBox, QPen, QBrush, QImage, QPixmap,
-                          QPainter)
+                          QDialogButtonBox)
 
+from spectral import noise
 from ui.ui_noise_dialog import Ui_Dialog
 from ui.ui_noise_dialog_custom import Ui_Form as CustomLayoutSetup
 from ui.ui_noise_dialog_stripes import Ui_Form as StripesLayoutSetup
 from ui.ui_noise_dialog_squares import Ui_Form as SquaresLayoutSetup
+from utils import image_to_array
 
 
 
@@ -37,15 +35,18 @@ class CustomLayout(SubLayout, CustomLayoutSetup):
     def settings(self):
         return {'path': self.path_label.text()}
 
-    def gen_painter(self, settings):
+    def gen_noise(self, settings):
         path = settings['path']
         spacing = settings['spacing']
         opacity = settings['opacity']
-
-        def p(painter, color):
-            tile_image = QImage(path)
-
-            return
+        try:
+            tile = noise.load_tile(path, lambda path: image_to_array(
+                QImage(path), to_gray=True))
+        except OSError:
+            return lambda image, color=0: None
+
+        def p(image, color=0):
+            noise.blend_tiled(image, tile, spacing, opacity/100)
         return p
 
 
@@ -58,25 +59,17 @@ class SquaresLayout(SubLayout, SquaresLayoutSetup):
         return {'width': self.slider_width.value(),
                 'height': self.slider_height.value()}
 
-    def gen_painter(self, settings):
+    def gen_noise(self, settings):
         spacing = settings['spacing']
         opacity = settings['opacity']
         random = settings['random']
         sq_width, sq_height = settings['width'], settings['height']
-        # I'm not too fond of generating my own textures, because .setPixel
-        # performance gave me serious ptsd already.
-        noise_brush = QBrush(QImage(":misc/noise.png"))
 
-        def p(painter, color):
-            device = painter.device()
-            width, height = device.width(), device.height()
-
-            painter.setOpacity(opacity/100)
-
-            for x, y in product(range(0, width, sq_width+spacing),
-                                range(0, height, sq_height+spacing)):
-                brush = noise_brush if random else color
-                painter.fillRect(x, y, sq_width, sq_height, brush)
+        def p(image, color=0):
+            coverage = noise.squares(image.shape, sq_width, sq_height,
+                                     spacing)
+            value = noise.texture(image.shape) if random else color
+            noise.blend(image, coverage, opacity/100, value)
         return p
 
 
@@ -89,44 +82,18 @@ class StripesLayout(SubLayout, StripesLayoutSetup):
         return {'thickness': self.slider_thickness.value(),
                 'angle': ang} # normalizing
 
-    def gen_painter(self, settings):
+    def gen_noise(self, settings):
         spacing = settings['spacing']
         thickness = settings['thickness']
         opacity = settings['opacity']
         random = settings['random']
         angle = settings['angle']
         angle = angle - 180 if (angle > 180) else angle
-        noise_brush = QBrush(QImage(":misc/noise.png"))
-
-        def p(painter, color):
-            device = painter.device()
-            width, height = device.width(), device.height()
-            painter.setRenderHint(QPainter.Antialiasing)
-            pen = QPen()
-            pen.setWidth(thickness)
-            if random:
-                pen.setBrush(noise_brush)
-            painter.setPen(pen)
-            painter.setOpacity(opacity/100)
-
-            def getpoints(x, y):
-                if angle in [0, 180]:
-                    return (0, y), (width, y)
-                if angle in [90, 270]:
-                    return (x, 0), (x, height)
-                derp = max(height, width)
-                deg = math.radians(angle)
-                p1 = (x - derp*math.cos(deg), y + derp * math.sin(deg))
-                p2 = (x+derp*math.cos(deg), y - derp * math.sin(deg))
-                return p1, p2
-
-
-            for pos in range(spacing+thickness, max(height, width), spacing+thickness):
-                x = pos if angle < 90 else width-pos
-                y = pos
-                (x1, y1), (x2, y2) = getpoints(x, y)
-                painter.drawLine(x1, y1, x2, y2)
-            return
+
+        def p(image, color=0):
+            coverage = noise.stripes(image.shape, thickness, spacing, angle)
+            value = noise.texture(image.shape) if random else color
+            noise.blend(image, coverage, opacity/100, value)
         return p
 
 
@@ -145,7 +112,7 @@ class NoiseDialog(QDialog, Ui_Dialog):
             yield l
 
     def on_accept(self):
-        return self.layout.gen_painter(self.settings)
+        return self.layout.gen_noise(self.settings)
 
     def init_layouts(self):
         self.custom_layout = CustomLayout()
@@ -194,5 +161,6 @@ class NoiseDialog(QDialog, Ui_Dialog):
         return settings
 
     @property
-    def painter_function(self):
-        return self.layout.gen_painter(self.settings)
+    def noise_function(self):
+        """ function(image) adding the chosen noise to a float image """
+        return self.layout.gen_noise(self.settings)
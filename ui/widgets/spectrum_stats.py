@@ -0,0 +1,71 @@
+from PySide.QtGui import QWidget, QVBoxLayout, QLabel
+from PySide.QtCore import QTimer
+import pyqtgraph as pg
+import numpy as np
+
+from spectral.stats import SpectralStats
+
+
+class SpectrumStatsWidget(QWidget):
+    """ Radial and azimuthal power profiles, energy per band, anisotropy
+
+        Radii are in % of the larger side, the units PassFilterDialog and
+        BandpassDialog take, so cutoffs can be read off the plot.
+    """
+    REDRAW_MS = 200
+    spectrum = None  # newest spectrum, not drawn yet
+
+    def __init__(self, parent_title, parent=None):
+        QWidget.__init__(self, parent)
+        self.setWindowTitle("{}'s Spectral statistics".format(parent_title))
+
+        self.radial = pg.PlotWidget(name="Radial power")
+        self.radial.setLogMode(y=True)
+        self.radial.setLabel('bottom', "radius", units='%')
+        self.radial_curve = self.radial.plot()
+
+        self.azimuthal = pg.PlotWidget(name="Azimuthal power")
+        self.azimuthal.setLabel('bottom', "direction", units='deg')
+        self.azimuthal_curve = self.azimuthal.plot()
+
+        self.summary = QLabel()
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.radial)
+        layout.addWidget(self.azimuthal)
+        layout.addWidget(self.summary)
+
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.setInterval(self.REDRAW_MS)
+        self.redraw_timer.timeout.connect(self.redraw)
+        self.resize(400, 500)
+
+    def update_spectrum(self, spectrum):
+        """ Centered spectrum, full or HalfSpectrum """
+        self.spectrum = spectrum
+        if self.isVisible() and not self.redraw_timer.isActive():
+            self.redraw_timer.start()
+
+    def redraw(self):
+        if self.spectrum is None or not self.isVisible():
+            return
+        stats = SpectralStats(self.spectrum)
+        self.spectrum = None
+
+        # DC would flatten everything else on the log scale
+        self.radial_curve.setData(stats.radii[1:], stats.radial[1:])
+        angles = len(stats.azimuthal)
+        self.azimuthal_curve.setData((np.arange(angles) + 0.5) * 180 / angles,
+                                     stats.azimuthal)
+
+        bands = ["{}-{}%: {:.2%}".format(lo, hi, energy) for lo, hi, energy
+                 in zip(stats.bands, stats.bands[1:], stats.band_energy)]
+        strength, angle = stats.anisotropy
+        self.summary.setText("\n".join(
+            bands + ["anisotropy: {:.3f} at {:.0f} deg".format(strength,
+                                                               angle)]))
+
+    def showEvent(self, event):
+        # hidden ones skip the work, catch up with the last spectrum
+        self.redraw()
+        super().showEvent(event)
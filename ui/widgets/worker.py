@@ -0,0 +1,84 @@
+import traceback
+
+from PySide.QtCore import QObject, QRunnable, QThreadPool, Signal, Slot
+
+FAILED = object()  # result of a job that raised, never reaches `finished`
+
+
+class JobSignals(QObject):
+    done = Signal(int, object)
+
+
+class Job(QRunnable):
+    def __init__(self, function, generation, args, signals):
+        super().__init__()
+        self.function = function
+        self.generation = generation
+        self.args = args
+        self.signals = signals
+
+    def run(self):
+        result = FAILED
+        try:
+            result = self.function(*self.args)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            # always, or the Worker would wait for this job forever
+            self.signals.done.emit(self.generation, result)
+
+
+class Worker(QObject):
+    """ Runs `function` on the global thread pool, newest call wins.
+
+        At most one job runs and one waits at a time; a new submit replaces
+        the waiting one (or gets merged with it by `merge(old, new)`), and
+        results of anything older than the last submit are thrown away.
+        A job that raises gets its traceback printed and no result, the
+        next one starts all the same.
+    """
+    finished = Signal(object)
+
+    def __init__(self, function, merge=None, parent=None):
+        super().__init__(parent)
+        self.function = function
+        self.merge = merge
+        self.generation = 0
+        self.running = False
+        self.pending = None
+        self.signals = JobSignals()
+        self.signals.done.connect(self._done)
+
+    def submit(self, *args):
+        self.generation += 1
+        if not self.running:
+            self._start(args)
+            return
+
+        if self.pending is not None and self.merge is not None:
+            args = self.merge(self.pending, args)
+        self.pending = args
+
+    def cancel(self):
+        """ Forget the waiting job and whatever is running now """
+        self.generation += 1
+        self.pending = None
+
+    @property
+    def busy(self):
+        return self.running or self.pending is not None
+
+    def _start(self, args):
+        self.running = True
+        job = Job(self.function, self.generation, args, self.signals)
+        QThreadPool.globalInstance().start(job)
+
+    @Slot(int, object)
+    def _done(self, generation, result):
+        self.running = False
+        if self.pending is not None:
+            args, self.pending = self.pending, None
+            self._start(args)
+
+        if generation == self.generation and result is not FAILED:
+            self.finished.emit(result)
@@ -1,8 +1,35 @@
 import numpy as np
-from PySide.QtGui import QImage
+from PySide.QtGui import QImage, qRgb
 
 import exceptions as e
-from numpy.fft import fft2, fftshift, ifft2, ifftshift
+from numpy.fft import fftshift, ifftshift
+from spectral.fft import fft2, ifft2
+from spectral.half import HalfSpectrum
+from spectral.document import spatial_to_array, spatial_to_image
+from spectral.resample import zeropad
+
+
+GRAY_TABLE = [qRgb(i, i, i) for i in range(256)]
+
+
+def gray(rgb):
+    """ Luminance of packed 0xAARRGGBB pixels, same weights as qGray """
+    r = (rgb >> 16) & 0xff
+    g = (rgb >> 8) & 0xff
+    b = rgb & 0xff
+    return ((r * 11 + g * 16 + b * 5) >> 5).astype(np.uint8)
+
+
+def image_bits(image, dtype=np.uint8):
+    """ Read-only array view of the image pixels, row padding sliced off
+
+        The view points into `image`, keep it alive while using it.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    h, row = image.height(), image.bytesPerLine() // itemsize
+    width = image.width() * image.depth() // 8 // itemsize
+    bits = np.frombuffer(image.constBits(), dtype=dtype, count=h * row)
+    return bits.reshape(h, row)[:, :width]
 
 
 def image_to_array(image, to_gray=False):
@@ -10,32 +37,53 @@ def image_to_array(image, to_gray=False):
     if not image:
         return
 
-    if image.format() == QImage.Format_Indexed8: # Because 32 bit alignment sucks.
-        image = image.convertToFormat(QImage.Format_RGB32)
-
-    bits = image.constBits()
-    w, h = image.width(), image.height()
-    array = np.frombuffer(bits, dtype=np.uint8).copy()
-
     if image.format() == QImage.Format_Indexed8:
-        return array.reshape(h, w)
-    else:
-        return array[0::4].reshape(h, w).copy()
+        table = np.array(image.colorTable(), dtype=np.uint32)
+        pixels = image_bits(image)
+        if np.array_equal(table, GRAY_TABLE):
+            return pixels.copy()
+        return gray(table)[pixels]
+
+    if image.format() not in (QImage.Format_RGB32, QImage.Format_ARGB32):
+        image = image.convertToFormat(QImage.Format_RGB32)
+    return gray(image_bits(image, np.uint32))
 
 
 def array_to_image(array):
-    """ :type array: np.ndarray """
+    """ Indexed8 gray QImage sharing memory with `array`
+
+        QImage wants 32 bit aligned rows, anything else gets copied
+        into a buffer with padded rows. The buffer is kept alive as
+        image.array. Float working images get clipped to uint8 here,
+        this is the only place they do.
+        :type array: np.ndarray
+    """
+    if array.dtype.kind == 'f':
+        array = spatial_to_array(array)
     if array.dtype != np.uint8:
         raise e.WrongArrayTypeException(array.dtype)
 
     h, w = array.shape
-
-    array = array.astype(np.uint32)
-    array = (array | array << 8 | array << 16)
-    image = QImage(array.tostring(), w, h, QImage.Format_RGB32)
+    if w % 4 or not array.flags.c_contiguous:
+        padded = np.empty((h, -(-w // 4) * 4), dtype=np.uint8)
+        padded[:, :w] = array
+        array = padded
+
+    image = QImage(array.data, w, h, array.strides[0],
+                   QImage.Format_Indexed8)
+    image.setColorTable(GRAY_TABLE)
+    image.array = array
     return image
 
 
+def rgb32_image(shape):
+    """ New Format_RGB32 QImage and a writable uint32 array view of it """
+    h, w = shape
+    image = QImage(w, h, QImage.Format_RGB32)
+    bits = np.frombuffer(image.bits(), dtype=np.uint32)
+    return image, bits.reshape(h, image.bytesPerLine() // 4)[:, :w]
+
+
 def rescale_array(array, scale_factor, max_value=255, dtype=np.uint8):
     scale_factor = scale_factor or np.max(array)
     return ((array/scale_factor) * max_value).astype(dtype), scale_factor
@@ -47,24 +95,13 @@ def descale_array(array, scale_factor, max_value=255):
 
 
 def fft_to_array(fft):
-    image = np.abs(ifft2(fft))
-    return image.clip(0, 255).astype(np.uint8)
+    """ float32 working image, see spectral.document.spatial_to_image """
+    if isinstance(fft, HalfSpectrum):
+        return spatial_to_image(fft.inverse())
+    return spatial_to_image(ifft2(fft))
 
 
-def array_to_fft(array):
+def array_to_fft(array, half=False):
+    if half:
+        return HalfSpectrum.from_array(array)
     return fftshift(fft2(array))
-
-
-def zeropad(x, shape):
-    '''Pad a two-dimensional NumPy array with zeros along its borders
-    to the specified shape.
-    '''
-    m, n = x.shape
-    p, q = shape
-    assert p > m
-    assert q > n
-    tb = (p - m) / 2
-    lr = (q - n) / 2
-    xpadded = np.zeros(shape, dtype=np.complex64)
-    xpadded[tb:tb + m, lr:lr + n] = x
-    return xpadded